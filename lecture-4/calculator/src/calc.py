@@ -1,5 +1,6 @@
 import flet as ft
-import math
+
+import engine
 
 
 class CalcButton(ft.ElevatedButton):
@@ -107,6 +108,12 @@ class CalculatorApp(ft.Container):
                         ScientificButton(text="ln", button_clicked=self.button_clicked),
                     ]
                 ),
+                ft.Row(
+                    controls=[
+                        ExtraActionButton(text="(", button_clicked=self.button_clicked),
+                        ExtraActionButton(text=")", button_clicked=self.button_clicked),
+                    ]
+                ),
                 ft.Row(
                     controls=[
                         ScientificButton(text="π", button_clicked=self.button_clicked),
@@ -118,138 +125,86 @@ class CalculatorApp(ft.Container):
             ]
         )
 
+    # function key -> how it wraps the current operand
+    WRAPPERS = {
+        "sin": "sin({})",
+        "cos": "cos({})",
+        "tan": "tan({})",
+        "√": "√({})",
+        "log": "log({})",
+        "ln": "ln({})",
+        "eˣ": "exp({})",
+        "1/x": "(1/{})",
+        "+/-": "(-{})",
+    }
+    OPERATORS = {"+": "+", "-": "-", "*": "*", "/": "/", "xⁿ": "^"}
+
     def button_clicked(self, e):
         data = e.control.data
         print(f"Button clicked with data = {data}")
-        
+
         if self.result.value == "Error" or data == "AC":
-            self.result.value = "0"
             self.reset()
 
         elif data in ("1", "2", "3", "4", "5", "6", "7", "8", "9", "0", "."):
-            if self.result.value == "0" or self.new_operand:
-                self.result.value = data
+            if self.new_operand:
+                self.expression = ""
                 self.new_operand = False
+            if self.expression.endswith(("e", "π")):
+                self.expression += "*"  # "2e" + "3" is 2·e·3, not 2e3
+            self.expression += data
+
+        elif data in self.OPERATORS:
+            # after "=" the result becomes the left operand
+            self.new_operand = False
+            expression = self.expression or "0"
+            if expression[-1] in "+-*/^" and data != "-":
+                expression = expression[:-1]
+            self.expression = expression + self.OPERATORS[data]
+
+        elif data in ("(", ")", "π", "e"):
+            if self.new_operand:
+                self.expression = ""
+                self.new_operand = False
+            if data == "e" and (self.expression[-1:].isdigit() or self.expression.endswith(".")):
+                self.expression += "*"  # "2" + "e" + "-3" is 2·e−3, not 2e-3 (= 0.002)
+            self.expression += data
+
+        elif data in ("%", "x²"):
+            self.new_operand = False
+            self.expression = (self.expression or "0") + ("%" if data == "%" else "²")
+
+        elif data in self.WRAPPERS:
+            self.new_operand = False
+            start = engine.last_operand(self.expression)
+            if start is None and data == "+/-":
+                self.expression += "-"
+            elif start is None:
+                self.expression += self.WRAPPERS[data][:-3]  # "sin(" and type the argument
             else:
-                self.result.value = self.result.value + data
-
-        elif data in ("+", "-", "*", "/"):
-            self.result.value = self.calculate(
-                self.operand1, float(self.result.value), self.operator
-            )
-            self.operator = data
-            if self.result.value == "Error":
-                self.operand1 = "0"
-            else:
-                self.operand1 = float(self.result.value)
-            self.new_operand = True
+                operand = self.expression[start:]
+                if data == "+/-" and operand.startswith("(-") and operand.endswith(")"):
+                    wrapped = operand[2:-1]
+                else:
+                    wrapped = self.WRAPPERS[data].format(operand)
+                self.expression = self.expression[:start] + wrapped
 
         elif data == "=":
-            self.result.value = self.calculate(
-                self.operand1, float(self.result.value), self.operator
-            )
-            self.reset()
-
-        elif data == "%":
-            self.result.value = float(self.result.value) / 100
-            self.reset()
-
-        elif data == "+/-":
-            if float(self.result.value) > 0:
-                self.result.value = "-" + str(self.result.value)
-            elif float(self.result.value) < 0:
-                self.result.value = str(
-                    self.format_number(abs(float(self.result.value)))
-                )
-
-        # Scientific functions
-        elif data == "sin":
-            self.result.value = self.format_number(math.sin(math.radians(float(self.result.value))))
-            self.reset()
-
-        elif data == "cos":
-            self.result.value = self.format_number(math.cos(math.radians(float(self.result.value))))
-            self.reset()
-
-        elif data == "tan":
-            self.result.value = self.format_number(math.tan(math.radians(float(self.result.value))))
-            self.reset()
-
-        elif data == "√":
-            if float(self.result.value) >= 0:
-                self.result.value = self.format_number(math.sqrt(float(self.result.value)))
-            else:
-                self.result.value = "Error"
-            self.reset()
-
-        elif data == "x²":
-            self.result.value = self.format_number(float(self.result.value) ** 2)
-            self.reset()
-
-        elif data == "xⁿ":
-            self.operator = "**"
-            self.operand1 = float(self.result.value)
-            self.new_operand = True
-
-        elif data == "log":
-            if float(self.result.value) > 0:
-                self.result.value = self.format_number(math.log10(float(self.result.value)))
-            else:
-                self.result.value = "Error"
-            self.reset()
-
-        elif data == "ln":
-            if float(self.result.value) > 0:
-                self.result.value = self.format_number(math.log(float(self.result.value)))
-            else:
-                self.result.value = "Error"
-            self.reset()
-
-        elif data == "π":
-            self.result.value = self.format_number(math.pi)
-            self.new_operand = True
-
-        elif data == "e":
-            self.result.value = self.format_number(math.e)
-            self.new_operand = True
-
-        elif data == "eˣ":
-            self.result.value = self.format_number(math.exp(float(self.result.value)))
-            self.reset()
-
-        elif data == "1/x":
-            if float(self.result.value) != 0:
-                self.result.value = self.format_number(1 / float(self.result.value))
-            else:
-                self.result.value = "Error"
+            try:
+                value = engine.evaluate(self.expression or "0")
+            except engine.CalcError:
+                value = "Error"
             self.reset()
+            if value != "Error":
+                self.expression = str(value)
+            self.result.value = value
 
+        if data != "=":
+            self.result.value = self.expression or "0"
         self.update()
 
-    def format_number(self, num):
-        if num % 1 == 0:
-            return int(num)
-        else:
-            return num
-
-    def calculate(self, operand1, operand2, operator):
-        if operator == "+":
-            return self.format_number(operand1 + operand2)
-        elif operator == "-":
-            return self.format_number(operand1 - operand2)
-        elif operator == "*":
-            return self.format_number(operand1 * operand2)
-        elif operator == "/":
-            if operand2 == 0:
-                return "Error"
-            else:
-                return self.format_number(operand1 / operand2)
-        elif operator == "**":
-            return self.format_number(operand1 ** operand2)
-
     def reset(self):
-        self.operator = "+"
-        self.operand1 = 0
+        self.expression = ""
         self.new_operand = True
 
 
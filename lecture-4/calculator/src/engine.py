@@ -0,0 +1,440 @@
+"""Expression engine for the calculator.
+
+Expressions are tokenized, parsed into an AST (with operator precedence and
+parentheses) and evaluated. Parsed expressions and evaluated sub-expressions
+are memoized, so repeated input is cheap. Nothing here depends on Flet:
+
+    >>> evaluate("2 + 3 * (4 - 1)")
+    11
+    >>> evaluate_many(["sin(30)", "√16", "1/0"])
+    [0.49999999999999994, 4, 'Error']
+
+Trigonometric functions take degrees, like the calculator buttons. Typed numbers
+may use scientific notation, so the e constant after a digit needs an explicit '*'
+(calc.py inserts it for the e key):
+
+    >>> evaluate("2e-3"), evaluate("2*e-3"), evaluate("2e+3")
+    (0.002, 2.43656365691809, 2000)
+    >>> evaluate_many(["sin(1e309)", "cos(1e308*10)", "1e999-1e999"])
+    ['Error', 'Error', 'Error']
+"""
+import csv
+import math
+import re
+import sys
+import time
+from functools import lru_cache
+from typing import NamedTuple, Union
+
+import numpy as np
+
+
+class CalcError(ValueError):
+    """Raised for syntax errors and for results that are not defined (1/0, √-1, ...)."""
+
+
+class Number(NamedTuple):
+    value: float
+
+
+class UnaryOp(NamedTuple):
+    op: str
+    operand: "Node"
+
+
+class BinOp(NamedTuple):
+    op: str
+    left: "Node"
+    right: "Node"
+
+
+class Call(NamedTuple):
+    func: str
+    arg: "Node"
+
+
+Node = Union[Number, UnaryOp, BinOp, Call]
+
+
+def _sqrt(x):
+    if x < 0:
+        raise CalcError("√ of a negative number")
+    return math.sqrt(x)
+
+
+def _log(x, log):
+    if x <= 0:
+        raise CalcError("log of a non-positive number")
+    return log(x)
+
+
+def _reciprocal(x):
+    if x == 0:
+        raise CalcError("division by zero")
+    return 1 / x
+
+
+FUNCTIONS = {
+    "sin": lambda x: math.sin(math.radians(x)),
+    "cos": lambda x: math.cos(math.radians(x)),
+    "tan": lambda x: math.tan(math.radians(x)),
+    "√": _sqrt,
+    "sqrt": _sqrt,
+    "log": lambda x: _log(x, math.log10),
+    "ln": lambda x: _log(x, math.log),
+    "exp": math.exp,
+    "sqr": lambda x: x ** 2,
+    "recip": _reciprocal,
+}
+CONSTANTS = {"π": math.pi, "pi": math.pi, "e": math.e}
+
+# binary operator -> (precedence, right associative)
+BINARY = {
+    "+": (1, False),
+    "-": (1, False),
+    "*": (2, False),
+    "/": (2, False),
+    "^": (4, True),
+    "**": (4, True),
+}
+UNARY_PRECEDENCE = 3  # -2^2 == -(2^2)
+
+_NUMBER = r"(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+_TOKEN = re.compile(rf"""
+    \s*(?:
+        (?P<number>{_NUMBER})
+      | (?P<name>[A-Za-zπ√]+)
+      | (?P<op>\*\*|[-+*/^%²()])
+    )""", re.VERBOSE)
+_TRAILING_NUMBER = re.compile(_NUMBER + "$")
+
+
+def tokenize(expression):
+    """'2*sin(30)' -> [('number', 2.0), ('op', '*'), ('name', 'sin'), ('op', '('), ...]"""
+    tokens = []
+    pos = 0
+    expression = expression.replace("×", "*").replace("÷", "/").replace("−", "-")
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match or match.end() == pos:
+            if expression[pos:].strip() == "":
+                break
+            raise CalcError(f"unexpected character {expression[pos]!r} at {pos}")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "number":
+            tokens.append(("number", float(text)))
+        elif kind == "name":
+            # 'sin' / 'π' / '√' can be written without spaces: '√2', '2π'
+            tokens.extend(("name", part) for part in _split_names(text))
+        else:
+            tokens.append(("op", text))
+    return tokens
+
+
+def _split_names(text):
+    names = []
+    while text:
+        for name in sorted(list(FUNCTIONS) + list(CONSTANTS), key=len, reverse=True):
+            if text.startswith(name):
+                names.append(name)
+                text = text[len(name):]
+                break
+        else:
+            raise CalcError(f"unknown name {text!r}")
+    return names
+
+
+class _Parser:
+    """Precedence-climbing parser. Juxtaposition ('2π', '3(4+1)') means multiplication."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise CalcError("empty expression")
+        node = self.expression(0)
+        if self.pos != len(self.tokens):
+            raise CalcError(f"unexpected {self.peek()[1]!r}")
+        return node
+
+    def expression(self, min_precedence):
+        left = self.unary()
+        while True:
+            kind, value = self.peek()
+            if kind == "op" and value in BINARY:
+                op = value
+            elif kind in ("number", "name") or (kind == "op" and value == "("):
+                op = "*"  # implicit multiplication
+            else:
+                return left
+            precedence, right_assoc = BINARY[op]
+            if precedence < min_precedence:
+                return left
+            if op == value:
+                self.take()
+            right = self.expression(precedence if right_assoc else precedence + 1)
+            left = BinOp("^" if op == "**" else op, left, right)
+
+    def unary(self):
+        kind, value = self.peek()
+        if kind == "op" and value in ("-", "+"):
+            self.take()
+            operand = self.expression(UNARY_PRECEDENCE)
+            return UnaryOp("-", operand) if value == "-" else operand
+        return self.postfix(self.primary())
+
+    def postfix(self, node):
+        while True:
+            kind, value = self.peek()
+            if kind == "op" and value == "%":
+                self.take()
+                node = BinOp("/", node, Number(100.0))
+            elif kind == "op" and value == "²":
+                self.take()
+                node = Call("sqr", node)
+            else:
+                return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "number":
+            return Number(value)
+        if kind == "name" and value in CONSTANTS:
+            return Number(CONSTANTS[value])
+        if kind == "name":
+            # 'sin(30)' or 'sin 30' / '√16'
+            if self.peek() == ("op", "("):
+                return Call(value, self.primary())
+            return Call(value, self.postfix(self.primary()))
+        if (kind, value) == ("op", "("):
+            node = self.expression(0)
+            if self.take() != ("op", ")"):
+                raise CalcError("missing ')'")
+            return node
+        raise CalcError("unexpected end of expression" if kind is None else f"unexpected {value!r}")
+
+
+@lru_cache(maxsize=4096)
+def parse(expression):
+    """Parses an expression into an AST (cached per expression string)."""
+    return _Parser(tokenize(expression)).parse()
+
+
+@lru_cache(maxsize=16384)
+def _eval(node):
+    # Nodes are tuples, so equal sub-expressions share one cache entry.
+    try:
+        result = _eval_node(node)
+    except CalcError:
+        raise
+    except (OverflowError, ZeroDivisionError, ValueError) as e:
+        # ValueError: math domain error (sin(inf), ...)
+        raise CalcError(str(e)) from None
+    if not math.isfinite(result):
+        # 1e309, 1e308*10, 1e999-1e999
+        raise CalcError("result is not a finite number")
+    return result
+
+
+def _eval_node(node):
+    if isinstance(node, Number):
+        return node.value
+    if isinstance(node, UnaryOp):
+        return -_eval(node.operand)
+    if isinstance(node, Call):
+        return float(FUNCTIONS[node.func](_eval(node.arg)))
+    left, right = _eval(node.left), _eval(node.right)
+    if node.op == "+":
+        return left + right
+    if node.op == "-":
+        return left - right
+    if node.op == "*":
+        return left * right
+    if node.op == "/":
+        if right == 0:
+            raise CalcError("division by zero")
+        return left / right
+    result = left ** right
+    if isinstance(result, complex):
+        raise CalcError("complex result")
+    return result
+
+
+def format_number(num):
+    """Integral results are shown without a decimal point (same as the buttons)."""
+    if math.isfinite(num) and num % 1 == 0:
+        return int(num)
+    return num
+
+
+def evaluate(expression):
+    """Evaluates one expression (str or parsed AST). Raises CalcError."""
+    node = parse(expression) if isinstance(expression, str) else expression
+    return format_number(_eval(node))
+
+
+def evaluate_many(expressions, error="Error"):
+    """Evaluates many expressions headlessly; failures become `error` instead of raising."""
+    results = []
+    for expression in expressions:
+        try:
+            results.append(evaluate(expression))
+        except CalcError:
+            results.append(error)
+    return results
+
+
+def last_operand(expression):
+    """
+    Index where the last operand of `expression` starts ('2+sin(30)' -> 2), or None if
+    the expression ends with an operator or '('. Used to apply a function key to it.
+
+        >>> last_operand("2+1e-05"), last_operand("2*e-3")
+        (2, 4)
+    """
+    end = len(expression.rstrip())
+    pos = end
+    while pos and expression[pos - 1] in "²%":
+        pos -= 1
+    if pos and expression[pos - 1] == ")":
+        depth = 0
+        while pos:
+            pos -= 1
+            depth += {")": 1, "(": -1}.get(expression[pos], 0)
+            if depth == 0:
+                break
+        if depth:
+            return None
+        while pos and (expression[pos - 1].isalpha() or expression[pos - 1] == "√"):
+            pos -= 1
+        return pos
+    start = pos
+    # a whole number such as '1e-05' (a result after '='), not just the digits after '-'
+    number = _TRAILING_NUMBER.search(expression, 0, pos)
+    if number:
+        pos = number.start()
+    while pos and (expression[pos - 1].isalnum() or expression[pos - 1] in ".π√"):
+        pos -= 1
+    return pos if pos < start else None
+
+
+def cache_info():
+    return {"parse": parse.cache_info(), "eval": _eval.cache_info()}
+
+
+def clear_cache():
+    parse.cache_clear()
+    _eval.cache_clear()
+
+
+def _finite_only(func):
+    # math.exp / x ** 2 raise OverflowError on scalars; element-wise that is NaN
+    def apply(x):
+        result = func(x)
+        return np.where(np.isfinite(result) | ~np.isfinite(x), result, np.nan)
+    return apply
+
+
+# Same operations as the scientific buttons, applied element-wise.
+# Inputs outside the domain give NaN for that element instead of raising.
+ARRAY_FUNCTIONS = {
+    "sin": lambda x: np.sin(np.radians(x)),
+    "cos": lambda x: np.cos(np.radians(x)),
+    "tan": lambda x: np.tan(np.radians(x)),
+    "√": lambda x: np.sqrt(np.where(x >= 0, x, np.nan)),
+    "log": lambda x: np.log10(np.where(x > 0, x, np.nan)),
+    "ln": lambda x: np.log(np.where(x > 0, x, np.nan)),
+    "eˣ": _finite_only(np.exp),
+    "x²": _finite_only(np.square),
+    "1/x": lambda x: np.reciprocal(np.where(x != 0, x, np.nan)),
+}
+ARRAY_FUNCTIONS.update({
+    "sqrt": ARRAY_FUNCTIONS["√"],
+    "exp": ARRAY_FUNCTIONS["eˣ"],
+    "sqr": ARRAY_FUNCTIONS["x²"],
+    "recip": ARRAY_FUNCTIONS["1/x"],
+})
+
+
+def apply_function(name, values):
+    """
+    Applies a scientific function ("sin", "√", "1/x", ...) to a whole array at once.
+    Returns a float64 array; elements outside the domain (√-1, log 0, 1/0, overflow) are NaN.
+    """
+    if name not in ARRAY_FUNCTIONS:
+        raise CalcError(f"unknown function {name!r}")
+    x = np.asarray(values, dtype=np.float64)
+    with np.errstate(all="ignore"):
+        return np.asarray(ARRAY_FUNCTIONS[name](x), dtype=np.float64)
+
+
+def read_csv_column(path, column):
+    """One CSV column (header name or 0-based index) as a float array; non-numeric cells are NaN."""
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f))
+    index = column if isinstance(column, int) else header.index(column)
+    try:
+        return np.loadtxt(path, delimiter=",", skiprows=1, usecols=index, dtype=np.float64,
+                          encoding="utf-8", ndmin=1)
+    except ValueError:
+        # blank or text cells: slower parser that turns them into NaN
+        return np.genfromtxt(path, delimiter=",", skip_header=1, usecols=index, dtype=np.float64,
+                             encoding="utf-8", ndmin=1)
+
+
+def apply_csv(path, column, name, output=None):
+    """Applies a scientific function to a CSV column. Writes one value per line to `output` if given."""
+    result = apply_function(name, read_csv_column(path, column))
+    if output is not None:
+        np.savetxt(output, result, fmt="%.17g", header=f"{name}({column})", comments="")
+    return result
+
+
+if __name__ == "__main__":
+    # python engine.py apply FUNC file.csv COLUMN [out.csv]  -> function over a CSV column
+    # otherwise: one expression per line on stdin, or a quick throughput check.
+    if len(sys.argv) > 1 and sys.argv[1] == "apply":
+        func, path, column = sys.argv[2:5]
+        column = int(column) if column.isdigit() else column
+        start = time.perf_counter()
+        result = apply_csv(path, column, func, sys.argv[5] if len(sys.argv) > 5 else None)
+        print(f"{func}({column}): {len(result):,} values, {int(np.isnan(result).sum()):,} NaN, "
+              f"{time.perf_counter() - start:.3f}s")
+    elif not sys.stdin.isatty():
+        for result in evaluate_many(line.strip() for line in sys.stdin if line.strip()):
+            print(result)
+    else:
+        import random
+
+        rng = random.Random(0)
+        ops = ["+", "-", "*", "/", "^"]
+        funcs = ["sin", "cos", "tan", "√", "log", "ln"]
+        expressions = [
+            f"{rng.choice(funcs)}({rng.randint(1, 90)}) {rng.choice(ops)} "
+            f"({rng.randint(1, 99)} {rng.choice(ops[:4])} {rng.randint(1, 9)})"
+            for _ in range(20000)
+        ]
+        start = time.perf_counter()
+        evaluate_many(expressions)
+        seconds = time.perf_counter() - start
+        print(f"{len(expressions)} expressions in {seconds:.3f}s "
+              f"({len(expressions) / seconds:,.0f}/s)")
+        print(cache_info())
+
+        values = np.random.default_rng(0).uniform(-1000, 1000, 1_000_000)
+        for name in ("sin", "√", "log", "1/x", "eˣ"):
+            start = time.perf_counter()
+            apply_function(name, values)
+            print(f"{name:>4} over {len(values):,} values: {(time.perf_counter() - start) * 1000:.1f} ms")
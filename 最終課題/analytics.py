@@ -0,0 +1,157 @@
+"""
+analysis.ipynb の仮説検証（仮説1: 開始→終了の変化、仮説2: 採用流入ギャップ）を
+ノートブック外からも使えるようにした関数群。
+
+月次データは date（各月1日）を index にした DataFrame として扱い、
+開始/終了の行は index の位置検索で取り出して全セグメント・全列をまとめて計算する。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from db import GAP_PREFIX, SEGMENTS, JobDatabase
+
+ACTIVE_COLS = {seg: active_col for seg, (active_col, _) in SEGMENTS.items()}
+NEW_COLS = {seg: new_col for seg, (_, new_col) in SEGMENTS.items()}
+INDICATORS = {"有効求人倍率": ACTIVE_COLS, "新規求人倍率": NEW_COLS}
+
+STAT_COLUMNS = ["開始", "終了", "変化量（終了-開始）", "変化率（%）"]
+
+
+def to_date_index(monthly):
+    """
+    月次データを date index の数値 DataFrame にする。
+    get_monthly_data()（年・月が文字列）、get_monthly_range()（period 列）、
+    date 列を持つフレームのどれでも受け付ける。
+    """
+    df = monthly.copy()
+    if isinstance(df.index, pd.DatetimeIndex):
+        pass
+    elif "date" in df.columns:
+        df = df.set_index("date")
+    elif "period" in df.columns:
+        df = df.set_index(pd.to_datetime(df["period"].astype(int).astype(str) + "01", format="%Y%m%d"))
+    else:
+        df = df[df["月"] != "平均"]
+        year = pd.to_numeric(df["年"]).astype(int)
+        month = pd.to_numeric(df["月"]).astype(int)
+        df = df.set_index(pd.to_datetime({"year": year, "month": month, "day": 1}))
+
+    df.index = pd.DatetimeIndex(df.index, name="date")
+    df = df.drop(columns=["年", "月", "年_int", "月_int", "period", "year", "month"], errors="ignore")
+    return df.apply(pd.to_numeric, errors="coerce").sort_index()
+
+
+def load_monthly(db=None, start=None, end=None, table_name="job_offers_jp"):
+    """DB の型付き月次テーブルから date index の月次データを読む（start/end は YYYYMM）"""
+    db = db or JobDatabase()
+    return to_date_index(db.get_monthly_range(start, end, table_name=table_name))
+
+
+def gap_frame(monthly):
+    """セグメントごとの採用流入ギャップ（新規求人倍率 − 有効求人倍率）を1回の配列演算で作る"""
+    segs = [seg for seg, cols in SEGMENTS.items() if all(c in monthly.columns for c in cols)]
+    new = monthly[[NEW_COLS[seg] for seg in segs]].to_numpy(dtype=float)
+    active = monthly[[ACTIVE_COLS[seg] for seg in segs]].to_numpy(dtype=float)
+    return pd.DataFrame(new - active, index=monthly.index, columns=[GAP_PREFIX + seg for seg in segs])
+
+
+def _positions(index, dates):
+    dates = pd.DatetimeIndex(pd.to_datetime(list(dates)))
+    pos = index.get_indexer(dates)
+    if (pos < 0).any():
+        missing = [d.strftime("%Y-%m") for d in dates[pos < 0]]
+        raise KeyError(f"月次データにない年月です: {', '.join(missing)}")
+    return pos
+
+
+def window_stats(frame, windows):
+    """
+    frame の全列について、windows [(開始, 終了), ...] ごとの変化量・変化率を返す。
+    行の取り出しは期間ごとではなく全期間ぶんまとめて1回の位置検索で行う。
+    """
+    if not isinstance(frame.index, pd.DatetimeIndex) or not frame.index.is_monotonic_increasing:
+        frame = to_date_index(frame)
+    starts, ends = zip(*windows)
+    values = frame.to_numpy(dtype=float)
+    s = values[_positions(frame.index, starts)]
+    e = values[_positions(frame.index, ends)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (e / s - 1.0) * 100.0
+
+    n_windows, n_cols = s.shape
+    return pd.DataFrame({
+        "期間開始": np.repeat(pd.to_datetime(list(starts)), n_cols),
+        "期間終了": np.repeat(pd.to_datetime(list(ends)), n_cols),
+        "列": np.tile(frame.columns.to_numpy(), n_windows),
+        "開始": s.ravel(),
+        "終了": e.ravel(),
+        "変化量（終了-開始）": (e - s).ravel(),
+        "変化率（%）": pct.ravel(),
+    })
+
+
+def _bounds(monthly, start, end):
+    return (monthly.index.min() if start is None else start,
+            monthly.index.max() if end is None else end)
+
+
+def change_stats(monthly, start=None, end=None):
+    """
+    仮説1: 有効/新規求人倍率 × セグメントの 開始→終了 の変化量・変化率（%）。
+    start/end を省略するとデータの最初と最後の月。
+    """
+    monthly = to_date_index(monthly)
+    columns = {col: (name, seg) for name, cols in INDICATORS.items() for seg, col in cols.items()}
+    stats = window_stats(monthly[list(columns)], [_bounds(monthly, start, end)])
+    labels = [columns[col] for col in stats.pop("列")]
+    stats.insert(0, "指標", [name for name, _ in labels])
+    stats.insert(1, "セグメント", [seg for _, seg in labels])
+    return stats.drop(columns=["期間開始", "期間終了"])
+
+
+def gap_stats(monthly, start=None, end=None):
+    """仮説2: セグメントごとのギャップ（新規−有効）の 開始→終了 の変化量・変化率（%）"""
+    monthly = to_date_index(monthly)
+    stats = window_stats(gap_frame(monthly), [_bounds(monthly, start, end)])
+    stats.insert(0, "セグメント", [c[len(GAP_PREFIX):] for c in stats.pop("列")])
+    return stats.drop(columns=["期間開始", "期間終了"])
+
+
+def series_window_stats(monthly, windows):
+    """求人倍率の全列とギャップ系列について、複数期間の変化をまとめて計算する"""
+    monthly = to_date_index(monthly)
+    return window_stats(pd.concat([monthly, gap_frame(monthly)], axis=1), windows)
+
+
+def _batch_task(name, monthly, windows):
+    stats = series_window_stats(monthly, windows)
+    stats.insert(0, "データ", name)
+    return stats
+
+
+def batch_stats(frames, windows, max_workers=None):
+    """
+    複数の月次データ（{名前: DataFrame}）× 複数期間の変化を、データごとにプロセスを分けて計算する。
+    max_workers=1 ならプロセスを使わずに順番に計算する。
+    """
+    if not frames:
+        return pd.DataFrame()
+    windows = list(windows)
+    max_workers = max_workers or min(len(frames), os.cpu_count() or 1)
+
+    if max_workers == 1:
+        results = [_batch_task(name, df, windows) for name, df in frames.items()]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_batch_task, name, df, windows) for name, df in frames.items()]
+            results = [future.result() for future in futures]
+    return pd.concat(results, ignore_index=True)
+
+
+if __name__ == "__main__":
+    monthly = load_monthly()
+    print(change_stats(monthly).to_string(index=False))
+    print(gap_stats(monthly).to_string(index=False))
@@ -0,0 +1,202 @@
+"""
+性能計測用スクリプト（本番の処理には使わない）
+
+    python benchmarks.py clean [行数]
+    python benchmarks.py extract [テーブル数]
+    python benchmarks.py snapshot [行数]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from db import JobDatabase
+from scrap import JilptScraper, find_table_html
+
+
+def make_synthetic_table(n_rows, seed=0):
+    """read_html(header=[0, 1]) の出力を模した求人倍率テーブルを作る"""
+    rng = np.random.default_rng(seed)
+    columns = pd.MultiIndex.from_tuples([
+        ("Unnamed: 0_level_0", "Unnamed: 0_level_1"),
+        ("Unnamed: 1_level_0", "Unnamed: 1_level_1"),
+        ("有効求人倍率", "新卒除き  パート含む"),
+        ("有効求人倍率", "新卒及び  パート除く"),
+        ("有効求人倍率", "パートタイム"),
+        ("新規求人倍率", "新卒除き  パート含む"),
+        ("新規求人倍率", "新卒及び  パート除く"),
+        ("新規求人倍率", "パートタイム"),
+        ("有効求人数", "Unnamed: 8_level_1"),
+    ])
+
+    col0, col1 = [], []
+    year = 1960
+    while len(col0) < n_rows:
+        col0.append(f"{year}年")
+        col1.append(np.nan)          # 年平均の行
+        for m in range(1, 13):
+            col0.append(np.nan if m > 1 else "")
+            col1.append(f"{m}月")
+        year += 1
+    col0, col1 = col0[:n_rows], col1[:n_rows]
+
+    ratios = rng.uniform(0.5, 2.5, size=(n_rows, 6)).round(2).astype(object)
+    ratios[rng.random(size=ratios.shape) < 0.02] = "-"
+    ratios[rng.random(size=ratios.shape) < 0.02] = np.nan
+    counts = [f"{v:,}" for v in rng.integers(100_000, 3_000_000, size=n_rows)]
+
+    data = [col0, col1] + [ratios[:, i] for i in range(6)] + [counts]
+    return pd.DataFrame(dict(zip(range(9), data))).set_axis(columns, axis=1)
+
+
+def legacy_clean_data(df):
+    """ベクトル化前の _clean_data（iterrows 版）の行処理部分"""
+    cleaned_rows = []
+    current_year = None
+
+    for idx, row in df.iterrows():
+        try:
+            col0 = str(row['年']).strip()
+            col1 = str(row['月']).strip()
+
+            year_part = ""
+            month_part = ""
+
+            if "年" in col0:
+                current_year = col0.replace('年', '')
+                year_part = current_year
+                if "月" in col1:
+                    month_part = col1.replace('月', '')
+                else:
+                    month_part = "平均"
+
+            elif (col0 == 'nan' or col0 == '') and "月" in col1:
+                year_part = current_year
+                month_part = col1.replace('月', '')
+
+            if not year_part: continue
+
+            row_data = {'年': year_part, '月': month_part}
+
+            for col_name in df.columns[2:]:
+                val = str(row[col_name]).replace(',', '').replace(' ', '')
+
+                if val.replace('.', '', 1).isdigit():
+                    row_data[col_name] = float(val)
+                else:
+                    row_data[col_name] = None
+
+            cleaned_rows.append(row_data)
+
+        except Exception:
+            continue
+
+    return pd.DataFrame(cleaned_rows)
+
+
+def bench_clean(n_rows=100_000):
+    table = make_synthetic_table(n_rows)
+    scraper = JilptScraper()
+
+    start = time.perf_counter()
+    result = scraper._clean_data(table.copy())
+    new_sec = time.perf_counter() - start
+
+    renamed = table.copy()
+    renamed.columns = result.columns[:2].tolist() + [
+        "_".join(str(c).strip() for c in col if "Unnamed" not in str(c)) for col in table.columns[2:]
+    ]
+    start = time.perf_counter()
+    expected = legacy_clean_data(renamed)
+    old_sec = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(result, expected)
+    print(f"_clean_data {n_rows:,} 行: iterrows {old_sec:.2f}s -> ベクトル化 {new_sec:.3f}s "
+          f"({old_sec / new_sec:.0f}倍, 出力一致)")
+
+
+def make_multi_table_page(n_tables, rows_per_table=200, seed=0):
+    """対象テーブルを n_tables 個の無関係なテーブルの後ろに置いたページ"""
+    rng = np.random.default_rng(seed)
+    parts = ["<html><head><meta charset='utf-8'></head><body><h1>有効求人倍率などの統計</h1>"]
+    for i in range(n_tables):
+        other = pd.DataFrame(rng.integers(0, 1000, size=(rows_per_table, 8)),
+                             columns=[f"項目{i}_{j}" for j in range(8)])
+        parts.append(other.to_html(index=False))
+    target = make_synthetic_table(rows_per_table, seed)
+    target.columns = pd.MultiIndex.from_tuples(
+        [("" if "Unnamed" in a else a, "" if "Unnamed" in b else b) for a, b in target.columns]
+    )
+    parts.append(target.to_html(index=False, na_rep=""))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 1024 / 1024
+
+
+def bench_extract(n_tables=100):
+    html = make_multi_table_page(n_tables)
+    print(f"ページサイズ: {len(html) / 1024 / 1024:.1f} MB, テーブル {n_tables + 1} 個")
+
+    def read_all():
+        dfs = pd.read_html(io.StringIO(html), header=[0, 1])
+        return next(df for df in dfs if "有効求人倍率" in str(df.columns))
+
+    def targeted(locator, flavor):
+        table_html = find_table_html(html, "有効求人倍率", locator=locator)
+        return pd.read_html(io.StringIO(table_html), header=[0, 1], flavor=flavor)[0]
+
+    expected, sec, peak = _measure(read_all)
+    print(f"  read_html(全テーブル)        : {sec:6.3f}s  Pythonヒープ最大 {peak:7.1f} MB")
+    for locator, flavor in [("scan", None), ("lxml", None), ("scan", "bs4")]:
+        try:
+            result, sec, peak = _measure(lambda: targeted(locator, flavor))
+        except ImportError as e:
+            print(f"  locator={locator}, flavor={flavor}: スキップ ({e})")
+            continue
+        pd.testing.assert_frame_equal(result, expected)
+        print(f"  locator={locator:4}, flavor={str(flavor):4} : {sec:6.3f}s  Pythonヒープ最大 {peak:7.1f} MB")
+
+
+def bench_snapshot(n_rows=100_000, repeat=5):
+    df = JilptScraper()._clean_data(make_synthetic_table(n_rows))
+    db = JobDatabase(os.path.join(tempfile.mkdtemp(), "data.db"))
+    db.save_data(df)
+    cols = ["有効求人倍率_パートタイム", "新規求人倍率_パートタイム"]
+
+    def timed(label, func):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        ms = (time.perf_counter() - start) / repeat * 1000
+        print(f"  {label:<40}: {ms:8.2f} ms ({len(result):,} 行)")
+
+    print(f"月次データ {len(df):,} 行")
+    timed("get_monthly_data (SQLite 全列)", db.get_monthly_data)
+    timed("read_snapshot 全列", db.read_snapshot)
+    timed("read_snapshot 2列", lambda: db.read_snapshot(columns=cols))
+    timed("read_snapshot 2列・2010-2019", lambda: db.read_snapshot(columns=cols, start=201001, end=201912))
+    timed("read_snapshot 全列 (Arrow のまま)", lambda: db.read_snapshot(as_arrow=True))
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "clean"
+    if target == "clean":
+        bench_clean(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
+    elif target == "extract":
+        bench_extract(int(sys.argv[2]) if len(sys.argv) > 2 else 100)
+    elif target == "snapshot":
+        bench_snapshot(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
@@ -1,6 +1,24 @@
+import os
 import sqlite3
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow as pa
+except ImportError:  # 列指向スナップショットは pyarrow があるときだけ作る
+    pa = None
+
+# 分析で使うセグメント: (有効求人倍率の列, 新規求人倍率の列)
+SEGMENTS = {
+    "全体（新卒除き＋パート含む）": ("有効求人倍率_新卒除き  パート含む", "新規求人倍率_新卒除き  パート含む"),
+    "正規（新卒・パート除く）": ("有効求人倍率_新卒及び  パート除く", "新規求人倍率_新卒及び  パート除く"),
+    "パートタイム": ("有効求人倍率_パートタイム", "新規求人倍率_パートタイム"),
+}
+GAP_PREFIX = "ギャップ（新規-有効）_"
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
 class JobDatabase:
 
     def __init__(self, db_name="data.db"):
@@ -9,20 +27,240 @@ class JobDatabase:
     def _get_connection(self):
         return sqlite3.connect(self.db_name)
 
-    def save_data(self, df, table_name="job_offers_jp"):
+    def save_data(self, df, table_name="job_offers_jp", mode="replace"):
+        """
+        mode="replace": テーブルを作り直して全件保存（従来の動作）
+        mode="upsert" : (年, 月) をキーに新しい月だけ追加・改訂された月だけ更新
+        upsert のときは {"inserted", "updated", "unchanged", "duplicates"} の件数を返す。
+        同じ (年, 月) の行が複数あれば後の行を残し、除いた行数を duplicates に数える。
+        型付きテーブルが元テーブルと揃っていない（初回の upsert など）ときは全件から作り直し、
+        rebuilt=True を返す。
+        """
 
         if df is None or df.empty:
             print("保存するデータがありません。")
             return
 
+        if mode == "upsert":
+            return self._upsert_data(df, table_name)
+
         conn = self._get_connection()
         try:
             df.to_sql(table_name, conn, if_exists='replace', index=False)
+            with conn:
+                self._refresh_normalized(conn, table_name, rebuild=True)
+                self._refresh_indicators(conn, table_name)
             print(f"成功: {len(df)} 件のデータをテーブル '{table_name}' に保存しました。(DB名: {self.db_name})")
         except Exception as e:
             print(f"データベースエラー: {e}")
+            return
+        finally:
+            conn.close()
+        self.write_snapshot(table_name)
+
+    def _upsert_data(self, df, table_name):
+        conn = self._get_connection()
+        try:
+            with conn:
+                counts = self._upsert_frame(conn, df, table_name)
+            self._print_counts(table_name, counts)
+        except Exception as e:
+            print(f"データベースエラー: {e}")
+            return None
         finally:
             conn.close()
+        if (counts["inserted"] or counts["updated"] or counts["rebuilt"]
+                or not os.path.exists(self.snapshot_path(table_name))):
+            self.write_snapshot(table_name)
+        return counts
+
+    def save_many(self, frames):
+        """
+        {テーブル名: DataFrame} をまとめて upsert する（1トランザクション）。
+        テーブルごとの件数 dict を返す。失敗した場合は何も書き込まずに None。
+        """
+        frames = {name: df for name, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            print("保存するデータがありません。")
+            return {}
+
+        conn = self._get_connection()
+        try:
+            with conn:
+                results = {name: self._upsert_frame(conn, df, name) for name, df in frames.items()}
+            for name, counts in results.items():
+                self._print_counts(name, counts)
+        except Exception as e:
+            print(f"データベースエラー: {e}")
+            return None
+        finally:
+            conn.close()
+        for name in results:
+            self.write_snapshot(name)
+        return results
+
+    def _print_counts(self, table_name, counts):
+        print(f"成功: テーブル '{table_name}' を差分更新しました。"
+              f"(追加 {counts['inserted']} 件 / 更新 {counts['updated']} 件 / 変更なし {counts['unchanged']} 件)")
+        if counts.get("rebuilt"):
+            print(f"注意: テーブル '{table_name}' の型付きテーブル・派生指標を全件から作り直しました。")
+        if counts.get("duplicates"):
+            print(f"注意: テーブル '{table_name}' で重複した (年, 月) の {counts['duplicates']} 行を除きました（後の行を残しています）。")
+
+    def _upsert_frame(self, conn, df, table_name):
+        key_cols = ["年", "月"]
+        value_cols = [c for c in df.columns if c not in key_cols]
+
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0}
+        # 同じ (年, 月) が複数行あると一意インデックスを作れないので、後ろの行を残す
+        keys = df[key_cols].astype(str)
+        duplicated = keys.duplicated(keep="last")
+        if duplicated.any():
+            counts["duplicates"] = int(duplicated.sum())
+            df = df[~duplicated.to_numpy()]
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {_quote(table_name)} (
+                "年" TEXT, "月" TEXT{''.join(f', {_quote(c)} REAL' for c in value_cols)}
+            )
+        """)
+        existing_cols = {row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table_name)})")}
+        for c in value_cols:
+            if c not in existing_cols:
+                conn.execute(f"ALTER TABLE {_quote(table_name)} ADD COLUMN {_quote(c)} REAL")
+        # 型付きテーブルがない、または一意インデックスがない（以前のコードや mode="replace" で
+        # 書かれた）テーブルは、型付きテーブル・派生指標が元テーブルと揃っている保証がないので全件から作り直す
+        rebuild = not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                   (f"{table_name}_monthly",)).fetchone()
+        index_name = "ux_" + table_name + "_period"
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+                            (index_name,)).fetchone():
+            rebuild = True
+            # mode="replace" で作ったテーブルには重複した (年, 月) が残っていることがある
+            removed = conn.execute(f"""
+                DELETE FROM {_quote(table_name)} WHERE rowid NOT IN
+                    (SELECT MAX(rowid) FROM {_quote(table_name)} GROUP BY "年", "月")
+            """).rowcount
+            counts["duplicates"] += max(removed, 0)
+            conn.execute(f"CREATE UNIQUE INDEX {_quote(index_name)} ON {_quote(table_name)} (\"年\", \"月\")")
+
+        select_cols = ", ".join(_quote(c) for c in key_cols + value_cols)
+        current = {
+            (row[0], row[1]): row[2:]
+            for row in conn.execute(f"SELECT {select_cols} FROM {_quote(table_name)}")
+        }
+
+        inserts, updates = [], []
+        records = df[key_cols + value_cols].astype(object).where(df[key_cols + value_cols].notna(), None)
+        for row in records.itertuples(index=False, name=None):
+            key, values = (str(row[0]), str(row[1])), tuple(row[2:])
+            if key not in current:
+                inserts.append(key + values)
+            elif current[key] != values:
+                updates.append(values + key)
+            else:
+                counts["unchanged"] += 1
+
+        placeholders = ", ".join("?" for _ in key_cols + value_cols)
+        conn.executemany(
+            f"INSERT INTO {_quote(table_name)} ({select_cols}) VALUES ({placeholders})", inserts
+        )
+        if value_cols:
+            set_clause = ", ".join(f"{_quote(c)} = ?" for c in value_cols)
+            conn.executemany(
+                f"UPDATE {_quote(table_name)} SET {set_clause} WHERE \"年\" = ? AND \"月\" = ?", updates
+            )
+        counts["inserted"] = len(inserts)
+        counts["updated"] = len(updates)
+        counts["rebuilt"] = rebuild
+        if rebuild:
+            self._refresh_normalized(conn, table_name, rebuild=True)
+            self._refresh_indicators(conn, table_name)
+        elif inserts or updates:
+            keys = [row[:2] for row in inserts] + [row[-2:] for row in updates]
+            self._refresh_normalized(conn, table_name, keys=keys)
+            changed = [int(y) * 100 + int(m) for y, m in keys if y.isdigit() and m.isdigit()]
+            if changed:
+                self._refresh_indicators(conn, table_name, since=min(changed))
+        return counts
+
+    def _refresh_normalized(self, conn, table_name, rebuild=False, keys=None):
+        """
+        元テーブル（年・月が TEXT、年平均は 月='平均'）から型付きテーブルを作る:
+          {table}_monthly : period INTEGER (YYYYMM) を主キーにした月次データ
+          {table}_annual  : year INTEGER を主キーにした年平均
+          series_values   : (source, series, period, value) の縦持ち。主キーが複合インデックスになる
+        CAST はここで1回だけ行い、分析側のクエリではインデックスを使えるようにする。
+        keys=[(年, 月), ...] を渡すとその行だけを反映する（None なら全件）。
+        """
+        value_cols = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table_name)})")
+                      if row[1] not in ("年", "月")]
+        monthly = _quote(f"{table_name}_monthly")
+        annual = _quote(f"{table_name}_annual")
+        col_defs = "".join(f", {_quote(c)} REAL" for c in value_cols)
+        col_list = "".join(f", {_quote(c)}" for c in value_cols)
+
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {monthly} "
+                     f"(period INTEGER PRIMARY KEY, year INTEGER, month INTEGER{col_defs})")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {annual} (year INTEGER PRIMARY KEY{col_defs})")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS series_values (
+                source TEXT NOT NULL,
+                series TEXT NOT NULL,
+                period INTEGER NOT NULL,
+                value REAL,
+                PRIMARY KEY (source, series, period)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_series_values_period ON series_values (source, period)")
+        for target in (monthly, annual):
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({target})")}
+            for c in value_cols:
+                if c not in existing:
+                    conn.execute(f"ALTER TABLE {target} ADD COLUMN {_quote(c)} REAL")
+
+        if rebuild:
+            conn.execute(f"DELETE FROM {monthly}")
+            conn.execute(f"DELETE FROM {annual}")
+            conn.execute("DELETE FROM series_values WHERE source = ?", (table_name,))
+
+        source = _quote(table_name)
+        # keys があれば (年, 月) の一意インデックスで変わった行だけを引く
+        key_filter = ' AND "年" = ? AND "月" = ?' if keys is not None else ""
+        params = [tuple(key) for key in keys] if keys is not None else [()]
+        conn.executemany(f"""
+            INSERT OR REPLACE INTO {monthly} (period, year, month{col_list})
+            SELECT CAST("年" AS INTEGER) * 100 + CAST("月" AS INTEGER),
+                   CAST("年" AS INTEGER), CAST("月" AS INTEGER){col_list}
+            FROM {source}
+            WHERE "月" != '平均' AND CAST("月" AS INTEGER) BETWEEN 1 AND 12 AND CAST("年" AS INTEGER) > 0
+            {key_filter}
+        """, params)
+        conn.executemany(f"""
+            INSERT OR REPLACE INTO {annual} (year{col_list})
+            SELECT CAST("年" AS INTEGER){col_list}
+            FROM {source}
+            WHERE "月" = '平均' AND CAST("年" AS INTEGER) > 0
+            {key_filter}
+        """, params)
+
+        if keys is None:
+            periods = None
+        else:
+            periods = [(int(y) * 100 + int(m),) for y, m in keys
+                       if str(y).isdigit() and str(m).isdigit()]
+            if not periods:
+                return
+        for c in value_cols:
+            if periods is None:
+                conn.execute(f"""
+                    INSERT OR REPLACE INTO series_values (source, series, period, value)
+                    SELECT ?, ?, period, {_quote(c)} FROM {monthly}
+                """, (table_name, c))
+            else:
+                conn.executemany(f"""
+                    INSERT OR REPLACE INTO series_values (source, series, period, value)
+                    SELECT ?, ?, period, {_quote(c)} FROM {monthly} WHERE period = ?
+                """, [(table_name, c, period) for (period,) in periods])
 
     def get_annual_data(self):
         
@@ -32,14 +270,239 @@ class JobDatabase:
         conn.close()
         return df
 
-    def get_monthly_data(self):
+    def get_monthly_data(self, table_name="job_offers_jp"):
         conn = self._get_connection()
         
-        query = "SELECT * FROM job_offers_jp WHERE 月 != '平均'"
+        query = f"SELECT * FROM {_quote(table_name)} WHERE 月 != '平均'"
         df = pd.read_sql_query(query, conn)
         conn.close()
         return df
 
+    def _refresh_indicators(self, conn, table_name, since=None):
+        """
+        派生指標テーブル indicators を period >= since の範囲だけ計算し直す（since=None なら全期間）。
+        系列ごとに 値・前月差・前年同月差・3/12か月移動平均・早期警戒フラグ を持ち、
+        ギャップ（新規−有効）もセグメントごとの系列として保存する。
+        早期警戒フラグ: 前年同月差がマイナス かつ 3か月平均が12か月平均を下回る。
+        """
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS indicators (
+                source TEXT NOT NULL,
+                series TEXT NOT NULL,
+                period INTEGER NOT NULL,
+                value REAL,
+                mom REAL,
+                yoy REAL,
+                mean_3m REAL,
+                mean_12m REAL,
+                warning INTEGER,
+                PRIMARY KEY (source, series, period)
+            ) WITHOUT ROWID
+        """)
+        if since is None:
+            conn.execute("DELETE FROM indicators WHERE source = ?", (table_name,))
+            since = 0
+
+        # 前年同月差と12か月平均のために since の1年前から読み込む
+        monthly = pd.read_sql_query(
+            f"SELECT * FROM {_quote(table_name + '_monthly')} WHERE period >= ? ORDER BY period",
+            conn, params=(since - 100,),
+        )
+        if monthly.empty:
+            return
+        monthly = monthly.set_index("period").drop(columns=["year", "month"])
+        for seg, (active_col, new_col) in SEGMENTS.items():
+            if active_col in monthly.columns and new_col in monthly.columns:
+                monthly[GAP_PREFIX + seg] = monthly[new_col] - monthly[active_col]
+
+        periods = monthly.index.to_numpy()
+        prev_month = np.where(periods % 100 == 1, periods - 89, periods - 1)
+        target = periods >= since
+
+        rows = []
+        for series in monthly.columns:
+            values = monthly[series]
+            mom = values.to_numpy() - values.reindex(prev_month).to_numpy()
+            yoy = values.to_numpy() - values.reindex(periods - 100).to_numpy()
+            mean_3m = values.rolling(3).mean().to_numpy()
+            mean_12m = values.rolling(12).mean().to_numpy()
+            warning = (yoy < 0) & (mean_3m < mean_12m)
+            frame = pd.DataFrame({
+                "period": periods, "value": values.to_numpy(), "mom": mom, "yoy": yoy,
+                "mean_3m": mean_3m, "mean_12m": mean_12m, "warning": warning.astype(int),
+            })[target]
+            frame = frame.astype(object).where(frame.notna(), None)
+            rows.extend((table_name, series, *row) for row in frame.itertuples(index=False, name=None))
+
+        conn.executemany("""
+            INSERT OR REPLACE INTO indicators
+                (source, series, period, value, mom, yoy, mean_3m, mean_12m, warning)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    def get_indicator(self, series, period, source="job_offers_jp"):
+        """1系列・1か月分の派生指標（主キー検索）。なければ None"""
+        conn = self._get_connection()
+        try:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                "SELECT * FROM indicators WHERE source = ? AND series = ? AND period = ?",
+                (source, series, period),
+            ).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def get_indicators(self, series, start=None, end=None, source="job_offers_jp"):
+        conn = self._get_connection()
+        try:
+            query = """
+                SELECT * FROM indicators
+                WHERE source = ? AND series = ? AND period BETWEEN ? AND ?
+                ORDER BY period
+            """
+            return pd.read_sql_query(query, conn, params=(source, series, start or 0, end or 999999))
+        finally:
+            conn.close()
+
+    def get_latest_indicators(self, source="job_offers_jp"):
+        """全系列の最新月の派生指標（ダッシュボード用）"""
+        conn = self._get_connection()
+        try:
+            query = """
+                SELECT * FROM indicators
+                WHERE source = ? AND period = (SELECT MAX(period) FROM indicators WHERE source = ?)
+                ORDER BY series
+            """
+            return pd.read_sql_query(query, conn, params=(source, source))
+        finally:
+            conn.close()
+
+    def get_monthly_range(self, start=None, end=None, table_name="job_offers_jp"):
+        """月次データ（型付き）を period (YYYYMM の整数) の範囲で取得する。主キーで範囲検索される。"""
+        conn = self._get_connection()
+        try:
+            query = (f"SELECT * FROM {_quote(table_name + '_monthly')} "
+                     "WHERE period BETWEEN ? AND ? ORDER BY period")
+            return pd.read_sql_query(query, conn, params=(start or 0, end or 999999))
+        finally:
+            conn.close()
+
+    def get_annual_range(self, start_year=None, end_year=None, table_name="job_offers_jp"):
+        conn = self._get_connection()
+        try:
+            query = (f"SELECT * FROM {_quote(table_name + '_annual')} "
+                     "WHERE year BETWEEN ? AND ? ORDER BY year")
+            return pd.read_sql_query(query, conn, params=(start_year or 0, end_year or 9999))
+        finally:
+            conn.close()
+
+    def get_series(self, series, start=None, end=None, source="job_offers_jp"):
+        """縦持ちテーブルから1系列だけを取得する（period, value）"""
+        conn = self._get_connection()
+        try:
+            query = """
+                SELECT period, value FROM series_values
+                WHERE source = ? AND series = ? AND period BETWEEN ? AND ?
+                ORDER BY period
+            """
+            return pd.read_sql_query(query, conn, params=(source, series, start or 0, end or 999999))
+        finally:
+            conn.close()
+
+    def snapshot_path(self, table_name="job_offers_jp"):
+        """data.db と同じ場所に置く Arrow IPC ファイル（例: data.job_offers_jp_monthly.arrow）"""
+        base = os.path.splitext(self.db_name)[0]
+        return f"{base}.{table_name}_monthly.arrow"
+
+    def write_snapshot(self, table_name="job_offers_jp"):
+        """
+        型付き月次テーブルを period 順に Arrow IPC 形式（非圧縮・メモリマップ可能）で書き出す。
+        pyarrow がないときや書き出しに失敗したときは None を返す。
+        """
+        if pa is None:
+            return None
+        conn = self._get_connection()
+        try:
+            df = pd.read_sql_query(
+                f"SELECT * FROM {_quote(table_name + '_monthly')} ORDER BY period", conn
+            )
+        except Exception as e:
+            print(f"スナップショット作成エラー: {e}")
+            return None
+        finally:
+            conn.close()
+
+        path = self.snapshot_path(table_name)
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(path + ".tmp", "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(path + ".tmp", path)
+        except (OSError, pa.ArrowException) as e:
+            # DB への保存は済んでいるので、スナップショットの失敗で呼び出し元を止めない
+            print(f"スナップショット作成エラー: {e}")
+            return None
+        return path
+
+    def read_snapshot(self, columns=None, start=None, end=None, table_name="job_offers_jp", as_arrow=False):
+        """
+        スナップショットから必要な列・期間だけを読む。
+        ファイルはメモリマップで開き、期間の絞り込みは period の二分探索によるスライス（コピーなし）。
+        as_arrow=True なら pyarrow.Table のまま返す。
+        """
+        if pa is None:
+            raise ImportError("read_snapshot には pyarrow が必要です")
+        table = pa.ipc.open_file(pa.memory_map(self.snapshot_path(table_name), "r")).read_all()
+
+        if start is not None or end is not None:
+            periods = table.column("period").to_numpy()
+            lo = np.searchsorted(periods, start, side="left") if start is not None else 0
+            hi = np.searchsorted(periods, end, side="right") if end is not None else len(periods)
+            table = table.slice(lo, hi - lo)
+        if columns is not None:
+            table = table.select(["period"] + [c for c in columns if c != "period"])
+        return table if as_arrow else table.to_pandas()
+
+    def get_scrape_state(self, url):
+        """前回取得時の ETag / Last-Modified / ハッシュ（なければ空の dict）"""
+        conn = self._get_connection()
+        try:
+            self._create_scrape_state(conn)
+            row = conn.execute(
+                "SELECT etag, last_modified, page_hash, table_hash FROM scrape_state WHERE url = ?", (url,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return {}
+        return {"etag": row[0], "last_modified": row[1], "page_hash": row[2], "table_hash": row[3]}
+
+    def save_scrape_state(self, url, etag=None, last_modified=None, page_hash=None, table_hash=None):
+        conn = self._get_connection()
+        try:
+            with conn:
+                self._create_scrape_state(conn)
+                conn.execute("""
+                    INSERT OR REPLACE INTO scrape_state (url, etag, last_modified, page_hash, table_hash, checked_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (url, etag, last_modified, page_hash, table_hash))
+        finally:
+            conn.close()
+
+    def _create_scrape_state(self, conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_state (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                page_hash TEXT,
+                table_hash TEXT,
+                checked_at TIMESTAMP
+            )
+        """)
+
 if __name__ == "__main__":
     db = JobDatabase()
     print("データベースクラスの初期化が完了しました。")
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+図1〜図3（スライド貼り付け用PNG）の作成。
+
+    python figures.py                 # data.db から図1〜図3を作成（変わっていない図はスキップ）
+    python figures.py --force         # 全部描き直す
+    python figures.py --table A --table B --workers 4   # 複数系列のレポートをまとめて作成
+
+フォントの探索結果は font_config.json に保存して次回から再利用し、
+各図の入力データのハッシュを figures_manifest.json に記録して、前回と同じ図は描かない。
+描画はプロセスプールで図ごとに並列に行う。
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+import pandas as pd
+
+import analytics
+from db import GAP_PREFIX, JobDatabase
+
+FONT_CACHE = "font_config.json"
+MANIFEST = "figures_manifest.json"
+DPI = 200
+
+FONT_CANDIDATES = {
+    "Darwin": ["Hiragino Sans"],
+    "Windows": ["Yu Gothic", "Meiryo"],
+}
+DEFAULT_FONTS = ["Noto Sans CJK JP", "IPAexGothic", "IPAGothic"]
+
+FIGURES = [
+    {
+        "file": "図1_有効求人倍率_月次_セグメント別推移.png",
+        "title": "図1：有効求人倍率（月次）セグメント別推移",
+        "ylabel": "有効求人倍率",
+        "series": analytics.ACTIVE_COLS,
+    },
+    {
+        "file": "図2_新規求人倍率_月次_セグメント別推移.png",
+        "title": "図2：新規求人倍率（月次）セグメント別推移",
+        "ylabel": "新規求人倍率",
+        "series": analytics.NEW_COLS,
+    },
+    {
+        "file": "図3_採用流入ギャップ_新規-有効_推移.png",
+        "title": "図3：採用流入ギャップ（新規求人倍率−有効求人倍率）の推移",
+        "ylabel": "ギャップ（新規−有効）",
+        "series": {seg: GAP_PREFIX + seg for seg in analytics.ACTIVE_COLS},
+    },
+]
+
+
+def _find_font():
+    from matplotlib import font_manager
+
+    candidates = FONT_CANDIDATES.get(platform.system(), []) + DEFAULT_FONTS
+    for family in candidates:
+        try:
+            path = font_manager.findfont(font_manager.FontProperties(family=family),
+                                         fallback_to_default=False)
+        except ValueError:
+            continue
+        return {"family": family, "path": path}
+    # 日本語フォントがなければ matplotlib の既定フォントのまま描く
+    return {"family": None, "path": None}
+
+
+@lru_cache(maxsize=None)
+def font_config(cache_file=FONT_CACHE):
+    """日本語フォントの {family, path}。font_manager での探索は初回だけ行い、結果をファイルに残す"""
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("system") == platform.system() and (
+                cached["path"] is None or os.path.exists(cached["path"])):
+            return {"family": cached["family"], "path": cached["path"]}
+    except (OSError, ValueError, KeyError):
+        pass
+
+    config = _find_font()
+    try:
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump({"system": platform.system(), **config}, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"フォント設定の保存エラー: {e}")
+    return config
+
+
+@lru_cache(maxsize=None)
+def _register_font(path):
+    # プロセスごとに1回だけフォントファイルを登録する
+    from matplotlib import font_manager
+    font_manager.fontManager.addfont(path)
+
+
+def _render(spec, data, path, font):
+    # pyplot を使わず Figure を直接作り、フォント指定もこの図の中だけに限る
+    import matplotlib
+    from matplotlib.figure import Figure
+
+    if font["path"]:
+        _register_font(font["path"])
+    with matplotlib.rc_context({"font.family": font["family"]} if font["family"] else {}):
+        fig = Figure(figsize=(10, 5))
+        ax = fig.subplots()
+        for seg, col in spec["series"].items():
+            ax.plot(data.index, data[col], marker="o", label=seg)
+        ax.set_title(spec["title"])
+        ax.set_xlabel("年月")
+        ax.set_ylabel(spec["ylabel"])
+        ax.legend()
+        fig.tight_layout()
+        tmp = path + ".tmp.png"
+        fig.savefig(tmp, dpi=DPI)
+    os.replace(tmp, path)
+    return path
+
+
+def _data_hash(spec, data, font):
+    h = hashlib.sha256()
+    h.update(json.dumps([spec, font["family"], DPI], ensure_ascii=False).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def figure_jobs(monthly, out_dir="."):
+    """1つの月次データから図1〜図3の (spec, 描画に使うデータ, 出力パス) を作る"""
+    monthly = analytics.to_date_index(monthly)
+    frame = pd.concat([monthly, analytics.gap_frame(monthly)], axis=1)
+    return [(spec, frame[list(spec["series"].values())], os.path.join(out_dir, spec["file"]))
+            for spec in FIGURES]
+
+
+def render_figures(jobs, max_workers=None, force=False):
+    """
+    jobs の図を描く。前回 PNG を書いたときと入力データのハッシュが同じ図はスキップする。
+    戻り値: {"rendered": [...], "skipped": [...]}
+    """
+    font = font_config()
+    manifests = {}
+    todo, skipped = [], []
+    for spec, data, path in jobs:
+        mpath = os.path.join(os.path.dirname(path) or ".", MANIFEST)
+        manifest = manifests.setdefault(mpath, _load_manifest(mpath))
+        digest = _data_hash(spec, data, font)
+        if not force and manifest.get(os.path.basename(path)) == digest and os.path.exists(path):
+            skipped.append(path)
+        else:
+            todo.append((spec, data, path, manifest, digest))
+
+    rendered = []
+    try:
+        max_workers = max_workers or min(len(todo), os.cpu_count() or 1)
+        if max_workers <= 1:
+            for spec, data, path, manifest, digest in todo:
+                _render(spec, data, path, font)
+                manifest[os.path.basename(path)] = digest
+                rendered.append(path)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = {pool.submit(_render, spec, data, path, font): (path, manifest, digest)
+                           for spec, data, path, manifest, digest in todo}
+                for future in as_completed(futures):
+                    path, manifest, digest = futures[future]
+                    future.result()
+                    manifest[os.path.basename(path)] = digest
+                    rendered.append(path)
+    finally:
+        # 途中で失敗しても描き終わった図のハッシュは残す
+        if rendered:
+            for mpath, manifest in manifests.items():
+                _save_manifest(mpath, manifest)
+
+    print(f"図の作成: {len(rendered)} 枚を描画、{len(skipped)} 枚は変更なしのためスキップしました。")
+    return {"rendered": rendered, "skipped": skipped}
+
+
+def render_reports(frames, out_dir=".", max_workers=None, force=False):
+    """
+    複数系列 {名前: 月次データ} の図1〜図3をまとめて作る。
+    系列が1つなら out_dir 直下、複数なら out_dir/名前/ に保存する。
+    """
+    jobs = []
+    for name, monthly in frames.items():
+        target = out_dir if len(frames) == 1 else os.path.join(out_dir, name)
+        os.makedirs(target, exist_ok=True)
+        jobs.extend(figure_jobs(monthly, target))
+    return render_figures(jobs, max_workers=max_workers, force=force)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="図1〜図3のPNGを作成する")
+    parser.add_argument("--db", default="data.db")
+    parser.add_argument("--table", action="append", help="月次データのテーブル名（複数指定可）")
+    parser.add_argument("--out", default=".")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="変更がなくても描き直す")
+    args = parser.parse_args()
+
+    db = JobDatabase(args.db)
+    frames = {table: db.get_monthly_data(table) for table in (args.table or ["job_offers_jp"])}
+    render_reports(frames, out_dir=args.out, max_workers=args.workers, force=args.force)
@@ -1,47 +1,160 @@
 import requests
+import numpy as np
 import pandas as pd
 import io
 import time
+import hashlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 from db import JobDatabase  
 
+_TABLE_TAG = re.compile(r"<(/?)table\b[^>]*>", re.IGNORECASE)
+_TR_TAG = re.compile(r"<tr\b", re.IGNORECASE)
+_THEAD_END = re.compile(r"</thead\s*>", re.IGNORECASE)
+
+
+def _header_region(table_html):
+    # thead があればその中、なければ最初の2行（read_html の header=[0, 1] に相当）
+    end = _THEAD_END.search(table_html)
+    if end:
+        return table_html[:end.start()]
+    rows = list(_TR_TAG.finditer(table_html))
+    return table_html if len(rows) < 3 else table_html[:rows[2].start()]
+
+
+def _find_by_scan(html, keyword):
+    spans, stack = [], []
+    for m in _TABLE_TAG.finditer(html):
+        if not m.group(1):
+            stack.append(m.start())
+        elif stack:
+            spans.append((stack.pop(), m.end()))
+
+    # ヘッダーにキーワードを含むテーブルのうち、中にキーワードを含むテーブルを持たない（一番内側の）
+    # ものを、ページ内で最初に現れる順に選ぶ
+    matches = [(start, end) for start, end in spans if keyword in _header_region(html[start:end])]
+    innermost = [(start, end) for start, end in matches
+                 if not any(start < s and e < end for s, e in matches)]
+    if not innermost:
+        return None
+    start, end = min(innermost)
+    return html[start:end]
+
+
+def _find_by_lxml(html, keyword):
+    from lxml import html as lxml_html
+
+    def has_keyword(table):
+        head = table.xpath("./thead/tr") or table.xpath("./tr | ./tbody/tr")[:2]
+        return keyword in "".join(row.text_content() for row in head)
+
+    root = lxml_html.fromstring(html)
+    for table in root.iter("table"):  # 文書順（外側のテーブルが先）
+        if has_keyword(table) and not any(has_keyword(t) for t in table.iterdescendants("table")):
+            return lxml_html.tostring(table, encoding="unicode")
+    return None
+
+
+def find_table_html(html, keyword, locator="scan"):
+    """
+    ページ全体を read_html にかけずに、ヘッダーに keyword を含む <table> の HTML だけを返す。
+    locator="scan": 正規表現でタグ位置だけを走査（DOM を作らない）
+    locator="lxml": lxml で DOM を作って探す
+    """
+    if locator == "lxml":
+        return _find_by_lxml(html, keyword)
+    return _find_by_scan(html, keyword)
+
+
 class JilptScraper:
     TARGET_URL = "https://www.jil.go.jp/kokunai/statistics/shuyo/0208.html"
+    KEYWORD = "有効求人倍率"
     
-    def __init__(self):
+    def __init__(self, locator="scan", flavor=None, url=None, keyword=None, throttle=None):
         self.headers = {'User-Agent': 'University Research Project (Student)'}
+        self.state = {}
+        self.url = url or self.TARGET_URL
+        self.keyword = keyword or self.KEYWORD
+        self.throttle = throttle  # HostThrottle（クローラーで共有）。None なら毎回 2 秒待つ
+        self.locator = locator  # 対象テーブルの探し方: "scan" / "lxml"
+        self.flavor = flavor    # read_html のパーサー: None(既定) / "lxml" / "bs4"
 
-    def scrape(self):
-        print(f"データ取得を開始します: {self.TARGET_URL}")
+    def scrape(self, db=None):
+        """
+        db を渡すと前回の ETag / Last-Modified / ハッシュを使い、
+        ページまたは対象テーブルが変わっていなければ解析前に None を返す。
+        """
+        print(f"データ取得を開始します: {self.url}")
+        previous = db.get_scrape_state(self.url) if db is not None else {}
+        self.state = {}
         
         try:
-            time.sleep(2) 
+            if self.throttle is not None:
+                self.throttle.wait(self.url)
+            else:
+                time.sleep(2) 
+
+            headers = dict(self.headers)
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
             
-            response = requests.get(self.TARGET_URL, headers=self.headers)
+            response = requests.get(self.url, headers=headers)
+            if response.status_code == 304:
+                print("ページは前回から更新されていません (304)。処理をスキップします。")
+                return None
             response.raise_for_status() 
             response.encoding = response.apparent_encoding #
 
+            page_hash = hashlib.sha256(response.content).hexdigest()
+            self.state = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "page_hash": page_hash,
+            }
+            if previous.get("page_hash") == page_hash:
+                print("ページ内容は前回と同じです。処理をスキップします。")
+                self.state["table_hash"] = previous.get("table_hash")
+                db.save_scrape_state(self.url, **self.state)
+                return None
+
             print("HTMLを解析中...")
-            html_content = io.StringIO(response.text)
-            
-            dfs = pd.read_html(html_content, header=[0, 1])
-            
-            target_df = None
-            for i, df in enumerate(dfs):
-                if "有効求人倍率" in str(df.columns):
-                    print(f"   >>> テーブル {i} が対象データと一致しました。処理を開始します。 <<<")
-                    target_df = df
-                    break
-            
-            if target_df is None:
+            table_html = find_table_html(response.text, self.keyword, locator=self.locator)
+            if table_html is None:
                 print("エラー: 対象のデータテーブルが見つかりませんでした。")
                 return None
 
+            table_hash = hashlib.sha256(table_html.encode("utf-8")).hexdigest()
+            self.state["table_hash"] = table_hash
+            if previous.get("table_hash") == table_hash:
+                print("対象テーブルは前回と同じです。クリーニングとDB保存をスキップします。")
+                # ページの他の部分だけが変わった場合も ETag とハッシュは更新しておく
+                if db is not None:
+                    db.save_scrape_state(self.url, **self.state)
+                return None
+
+            print("   >>> 対象テーブルを特定しました。このテーブルだけを解析します。 <<<")
+            target_df = pd.read_html(io.StringIO(table_html), header=[0, 1], flavor=self.flavor)[0]
+
             return self._clean_data(target_df)
 
         except Exception as e:
             print(f"スクレイピング中にエラーが発生しました: {e}")
             return None
 
+    def run(self, db):
+        """変更があったときだけクリーニング・DB保存を行い、保存できたら取得状態を記録する"""
+        df = self.scrape(db)
+        if df is None:
+            return None
+        result = db.save_data(df, mode="upsert")
+        if result is not None:
+            db.save_scrape_state(self.url, **self.state)
+        return result
+
     def _clean_data(self, df):
         print("3. データのクリーニング中...")
         
@@ -58,53 +171,143 @@ class JilptScraper:
             new_columns.append(clean_col)
         df.columns = new_columns 
 
-        cleaned_rows = []
-        current_year = None 
-        
-        for idx, row in df.iterrows():
+        if len(df) == 0:
+            print("   クリーニング完了: 0 件のデータを抽出しました。")
+            return pd.DataFrame()
+
+        col0 = self._as_text(df['年']).str.strip()
+        col1 = self._as_text(df['月']).str.strip()
+
+        # 「2024年」の行で年が切り替わり、空欄の行は直前の年を引き継ぐ
+        is_year_row = col0.str.contains("年", regex=False)
+        is_month_row = ~is_year_row & col0.isin(["nan", ""]) & col1.str.contains("月", regex=False)
+        current_year = col0.str.replace("年", "", regex=False).where(is_year_row).ffill()
+
+        month = col1.str.replace("月", "", regex=False)
+        month = month.where(is_month_row | col1.str.contains("月", regex=False), "平均")
+
+        keep = (is_year_row | is_month_row) & current_year.notna() & (current_year != "")
+        keep = keep.to_numpy()
+        if not keep.any():
+            print("   クリーニング完了: 0 件のデータを抽出しました。")
+            return pd.DataFrame()
+
+        cleaned = {
+            '年': current_year[keep].tolist(),
+            '月': month[keep].tolist(),
+        }
+        unconvertible = np.zeros(int(keep.sum()), dtype=bool)
+        for i, col_name in enumerate(df.columns[2:], start=2):
+            cleaned[col_name], bad = self._to_number(df.iloc[keep, i])
+            unconvertible |= bad
+
+        result = pd.DataFrame(cleaned)
+        if unconvertible.any():
+            # 従来の処理は float() できない値（'①' など）を含む行を丸ごと飛ばしていた
+            result = result[~unconvertible].reset_index(drop=True)
+        print(f"   クリーニング完了: {len(result)} 件のデータを抽出しました。")
+        return result
+
+    @staticmethod
+    def _as_text(series):
+        # 欠損値は従来どおり文字列 "nan" として扱う
+        return series.astype(str).where(series.notna(), "nan")
+
+    @staticmethod
+    def _to_number(series):
+        """
+        カンマ・空白を除いて「数字（小数点1つまで）」だけの値を数値化し、それ以外は欠損にする。
+        戻り値: (値, float() できない行のマスク)。str.isdigit() は '①' や '²' も数字とみなすので、
+        数字に見えても変換できない値は行ごと除くために印を付ける。
+        """
+        bad = np.zeros(len(series), dtype=bool)
+        if series.dtype.kind in "iuf":
+            # 数値列は文字列化せずに同じ判定をする（負数・指数表記・inf/nan は欠損）
+            values = series.to_numpy(dtype=float)
+            with np.errstate(invalid="ignore"):
+                is_number = (np.isfinite(values) & ~np.signbit(values) & (values < 1e16)
+                             & ((values >= 1e-4) | (values == 0)))
+            values = np.where(is_number, values, np.nan)
+        else:
+            text = JilptScraper._as_text(series).str.replace(",", "", regex=False).str.replace(" ", "", regex=False)
+            is_number = text.str.replace(".", "", n=1, regex=False).str.isdigit().to_numpy(dtype=bool)
+            cells = text.where(is_number, "nan").tolist()
             try:
-                col0 = str(row['年']).strip()
-                col1 = str(row['月']).strip()
-                
-                year_part = ""
-                month_part = ""
-                
-                if "年" in col0:
-                    current_year = col0.replace('年', '')
-                    year_part = current_year
-                    if "月" in col1:
-                        month_part = col1.replace('月', '')
-                    else:
-                        month_part = "平均"
-                
-                elif (col0 == 'nan' or col0 == '') and "月" in col1:
-                    year_part = current_year
-                    month_part = col1.replace('月', '')
-                
-                if not year_part: continue
-
-                row_data = {'年': year_part, '月': month_part}
-                
-                for col_name in df.columns[2:]:
-                    val = str(row[col_name]).replace(',', '').replace(' ', '')
-                    
-                    if val.replace('.', '', 1).isdigit():
-                        row_data[col_name] = float(val)
-                    else:
-                        row_data[col_name] = None 
-                
-                cleaned_rows.append(row_data)
-                
-            except Exception:
-                continue
-
-        print(f"   クリーニング完了: {len(cleaned_rows)} 件のデータを抽出しました。")
-        return pd.DataFrame(cleaned_rows)
+                values = np.array(cells, dtype=float)
+            except ValueError:
+                values = np.full(len(cells), np.nan)
+                for j, cell in enumerate(cells):
+                    try:
+                        values[j] = float(cell)
+                    except ValueError:
+                        bad[j] = True
+                is_number = is_number & ~bad
+
+        if not is_number.any():
+            return [None] * len(values), bad
+        return values, bad
+
+class HostThrottle:
+    """同じホストへのリクエスト開始を delay 秒以上あける（スレッド間で共有する）"""
+
+    def __init__(self, delay=2.0):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next_start = {}
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.delay
+        time.sleep(start - now)
+
+
+class JilptCrawler:
+    """
+    /kokunai/statistics/shuyo/ 配下の複数ページを並行して取得し、
+    系列ごとのテーブルに1回のトランザクションで保存する。
+
+    pages: [{"url": ..., "table": ..., "keyword": ...}, ...]（keyword は省略可）
+    """
+
+    def __init__(self, pages, max_workers=4, delay=2.0, locator="scan", flavor=None):
+        self.pages = pages
+        self.max_workers = max_workers
+        self.delay = delay
+        self.locator = locator
+        self.flavor = flavor
+
+    def crawl(self, db):
+        throttle = HostThrottle(self.delay)
+        scrapers = {
+            page["table"]: JilptScraper(locator=self.locator, flavor=self.flavor, url=page["url"],
+                                        keyword=page.get("keyword"), throttle=throttle)
+            for page in self.pages
+        }
+
+        frames = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(scraper.scrape, db): table for table, scraper in scrapers.items()}
+            for future in as_completed(futures):
+                df = future.result()
+                if df is not None:
+                    frames[futures[future]] = df
+
+        print(f"クロール完了: {len(self.pages)} ページ中 {len(frames)} ページに更新がありました。")
+        if not frames:
+            return {}
+
+        results = db.save_many(frames)
+        if results:
+            for table in results:
+                scraper = scrapers[table]
+                db.save_scrape_state(scraper.url, **scraper.state)
+        return results
+
 
 if __name__ == "__main__":
     scraper = JilptScraper()
-    df = scraper.scrape()
-    
-    if df is not None:
-        db = JobDatabase()
-        db.save_data(df)
\ No newline at end of file
+    db = JobDatabase()
+    scraper.run(db)
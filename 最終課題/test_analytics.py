@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+from db import GAP_PREFIX
+
+
+def _monthly():
+    """get_monthly_data() と同じ形（年・月が文字列、年平均の行つき）の小さな月次データ"""
+    rows = []
+    for i, (year, month) in enumerate([(2024, 10), (2024, 11), (2024, 12), (2025, 1), (2025, 2)]):
+        row = {"年": str(year), "月": str(month)}
+        for j, (active_col, new_col) in enumerate(analytics.SEGMENTS.values()):
+            row[active_col] = 1.0 + 0.1 * j - 0.02 * i
+            row[new_col] = 2.0 + 0.2 * j - 0.05 * i * (j + 1)
+        rows.append(row)
+    rows.append({"年": "2024", "月": "平均", **{c: 9.9 for c in rows[0] if c not in ("年", "月")}})
+    return pd.DataFrame(rows)
+
+
+def _notebook_rows(monthly, start_date, end_date):
+    # analysis.ipynb の仮説1・仮説2のセルと同じ計算
+    monthly = monthly[monthly["月"] != "平均"].copy()
+    monthly["date"] = pd.to_datetime(monthly["年"] + "-" + monthly["月"] + "-01")
+    start_row = monthly.loc[monthly["date"] == start_date].iloc[0]
+    end_row = monthly.loc[monthly["date"] == end_date].iloc[0]
+
+    h1 = []
+    for name, cols in (("有効求人倍率", analytics.ACTIVE_COLS), ("新規求人倍率", analytics.NEW_COLS)):
+        for seg, col in cols.items():
+            s, e = float(start_row[col]), float(end_row[col])
+            h1.append([name, seg, s, e, e - s, (e / s - 1.0) * 100.0])
+
+    h2 = []
+    for seg in analytics.ACTIVE_COLS:
+        gap = monthly[analytics.NEW_COLS[seg]] - monthly[analytics.ACTIVE_COLS[seg]]
+        s = float(gap[monthly["date"] == start_date].iloc[0])
+        e = float(gap[monthly["date"] == end_date].iloc[0])
+        h2.append([seg, s, e, e - s, (e / s - 1.0) * 100.0])
+    return h1, h2
+
+
+def test_change_stats_matches_notebook():
+    monthly = _monthly()
+    expected, _ = _notebook_rows(monthly, "2024-11-01", "2025-02-01")
+    result = analytics.change_stats(monthly, "2024-11-01", "2025-02-01")
+    pd.testing.assert_frame_equal(
+        result, pd.DataFrame(expected, columns=["指標", "セグメント"] + analytics.STAT_COLUMNS))
+
+
+def test_gap_stats_matches_notebook():
+    monthly = _monthly()
+    _, expected = _notebook_rows(monthly, "2024-10-01", "2025-02-01")
+    result = analytics.gap_stats(monthly)  # 省略時はデータの最初と最後の月
+    pd.testing.assert_frame_equal(
+        result, pd.DataFrame(expected, columns=["セグメント"] + analytics.STAT_COLUMNS))
+
+
+def test_window_stats_several_windows():
+    frame = analytics.to_date_index(_monthly())
+    col = analytics.ACTIVE_COLS["パートタイム"]
+    windows = [("2024-10-01", "2024-12-01"), ("2024-12-01", "2025-02-01"), ("2025-01-01", "2025-01-01")]
+    stats = analytics.window_stats(frame[[col]], windows)
+
+    assert len(stats) == len(windows)
+    for (start, end), row in zip(windows, stats.itertuples(index=False)):
+        s, e = frame.loc[start, col], frame.loc[end, col]
+        assert row[0] == pd.Timestamp(start) and row[1] == pd.Timestamp(end)
+        assert row[3:] == pytest.approx((s, e, e - s, (e / s - 1.0) * 100.0))
+
+
+def test_window_stats_gap_columns():
+    frame = analytics.to_date_index(_monthly())
+    stats = analytics.series_window_stats(_monthly(), [("2024-10-01", "2025-02-01")])
+    gap_col = GAP_PREFIX + "全体（新卒除き＋パート含む）"
+    row = stats[stats["列"] == gap_col].iloc[0]
+    seg_cols = analytics.SEGMENTS["全体（新卒除き＋パート含む）"]
+    expected = frame[seg_cols[1]] - frame[seg_cols[0]]
+    assert row["開始"] == pytest.approx(expected.iloc[0])
+    assert row["終了"] == pytest.approx(expected.iloc[-1])
+
+
+def test_window_stats_missing_month():
+    frame = analytics.to_date_index(_monthly())
+    with pytest.raises(KeyError, match="2025-03"):
+        analytics.window_stats(frame, [("2024-10-01", "2025-03-01")])
+
+
+def test_window_stats_zero_start_is_inf():
+    frame = pd.DataFrame({"x": [0.0, 1.0]}, index=pd.DatetimeIndex(["2024-01-01", "2024-02-01"]))
+    stats = analytics.window_stats(frame, [("2024-01-01", "2024-02-01")])
+    assert np.isinf(stats["変化率（%）"].iloc[0])
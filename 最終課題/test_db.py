@@ -0,0 +1,58 @@
+import sqlite3
+
+import pandas as pd
+
+from db import SEGMENTS, JobDatabase, pa
+
+
+def _frame(months):
+    """get_monthly_data() と同じ形（年・月が文字列、年平均の行つき）の月次データ"""
+    rows = []
+    for i in range(months):
+        year, month = 2023 + i // 12, i % 12 + 1
+        row = {"年": str(year), "月": str(month)}
+        for j, (active_col, new_col) in enumerate(SEGMENTS.values()):
+            row[active_col] = round(1.0 + 0.1 * j - 0.01 * i, 2)
+            row[new_col] = round(2.0 + 0.2 * j - 0.03 * i, 2)
+        rows.append(row)
+    rows.append({"年": "2023", "月": "平均", **{c: 1.5 for c in rows[0] if c not in ("年", "月")}})
+    return pd.DataFrame(rows)
+
+
+def _dump(db_name):
+    conn = sqlite3.connect(db_name)
+    try:
+        return {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3").fetchall()
+                for table in ("job_offers_jp_monthly", "job_offers_jp_annual", "series_values", "indicators")}
+    finally:
+        conn.close()
+
+
+def test_upsert_backfills_table_written_by_old_code(tmp_path):
+    old = _frame(20)
+    db = JobDatabase(str(tmp_path / "old.db"))
+    # 以前の保存処理: 元テーブルだけを to_sql で書いていた
+    conn = sqlite3.connect(db.db_name)
+    old.to_sql("job_offers_jp", conn, if_exists="replace", index=False)
+    conn.close()
+
+    counts = db.save_data(old, mode="upsert")
+    assert (counts["inserted"], counts["updated"], counts["unchanged"]) == (0, 0, len(old))
+    assert counts["rebuilt"]
+    assert len(db.get_monthly_range()) == 20
+    if pa is not None:
+        assert len(db.read_snapshot()) == 20
+
+    new = _frame(21)
+    new.iloc[3, 2] = 9.99
+    counts = db.save_data(new, mode="upsert")
+    assert (counts["inserted"], counts["updated"], counts["rebuilt"]) == (1, 1, False)
+
+    fresh = JobDatabase(str(tmp_path / "fresh.db"))
+    fresh.save_data(new)
+    # 指標は移動平均の計算順で最後の桁が変わることがあるので値を丸めて比べる
+    result, expected = _dump(db.db_name), _dump(fresh.db_name)
+    for table in result:
+        assert pd.DataFrame(result[table]).round(9).equals(pd.DataFrame(expected[table]).round(9)), table
+    if pa is not None:
+        assert len(db.read_snapshot()) == 21
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from benchmarks import legacy_clean_data, make_synthetic_table
+from scrap import JilptScraper, find_table_html
+
+
+def _table(title, rows):
+    body = "".join(f"<tr><td>{i}</td><td>{i * 0.1:.2f}</td></tr>" for i in range(rows))
+    return f"<table><thead><tr><th>年月</th><th>{title}</th></tr></thead><tbody>{body}</tbody></table>"
+
+
+@pytest.mark.parametrize("locator", ["scan", "lxml"])
+def test_first_matching_table_wins(locator):
+    # 最初の（大きい）テーブルも2番目の（小さい）テーブルもヘッダーにキーワードを含む
+    html = (f"<html><body>{_table('人口', 3)}{_table('有効求人倍率', 10)}"
+            f"{_table('有効求人倍率（参考）', 2)}</body></html>")
+    table = find_table_html(html, "有効求人倍率", locator=locator)
+    assert "有効求人倍率（参考）" not in table
+    assert table.count("<tr>") == 11
+
+
+@pytest.mark.parametrize("locator", ["scan", "lxml"])
+def test_innermost_matching_table(locator):
+    # レイアウト用の外側のテーブルではなく、中のデータのテーブルを選ぶ
+    inner = _table("有効求人倍率", 2)
+    html = f"<html><body><table><tr><td>{inner}</td></tr></table></body></html>"
+    table = find_table_html(html, "有効求人倍率", locator=locator)
+    assert table.startswith("<table><thead>")
+    assert table.count("<table") == 1
+
+
+@pytest.mark.parametrize("locator", ["scan", "lxml"])
+def test_no_matching_table(locator):
+    assert find_table_html(f"<html><body>{_table('人口', 2)}</body></html>", "有効求人倍率",
+                           locator=locator) is None
+
+
+def _clean_both(table):
+    result = JilptScraper()._clean_data(table.copy())
+    renamed = table.copy()
+    renamed.columns = ["年", "月"] + [
+        "_".join(str(c).strip() for c in col if "Unnamed" not in str(c)) for col in table.columns[2:]
+    ]
+    return result, legacy_clean_data(renamed)
+
+
+def test_clean_data_matches_legacy():
+    result, expected = _clean_both(make_synthetic_table(300))
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_clean_data_skips_rows_with_unconvertible_digits():
+    # '①' '²' は str.isdigit() では数字だが float() できない。'١٢' は 12.0 になる
+    table = make_synthetic_table(30)
+    table = table.astype({col: object for col in table.columns[2:]})
+    for row, cell in [(2, "①"), (5, "²"), (7, "١٢"), (9, "1.2")]:
+        table.iloc[row, 3] = cell
+    result, expected = _clean_both(table)
+    pd.testing.assert_frame_equal(result, expected)
+    assert len(result) == 28
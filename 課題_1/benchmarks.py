@@ -0,0 +1,143 @@
+"""
+一覧ページ解析の性能計測用スクリプト（本番の処理には使わない）
+
+    python benchmarks.py                 # github_repositories.db の内容から作った一覧ページで計測
+    python benchmarks.py saved_pages/    # scraper.py --save-html で保存した HTML で計測
+"""
+import glob
+import html
+import os
+import sqlite3
+import sys
+import time
+
+from listing_parser import ListingParser
+from scraper import DB_NAME, parse_repositories
+
+PER_PAGE = 30
+
+
+def _format_stars(stars):
+    return f"{stars / 1000:.1f}k" if stars >= 1000 else str(stars)
+
+
+def _item_current(name, language, stars):
+    # 現在の GitHub の一覧（ハッシュ付きクラス名）
+    lang = (f'<span class="ReposListItem-module__Text_4--mkG7R">{html.escape(language)}</span>'
+            if language != "不明" else "")
+    return (f'<li class="ListItem-module__listItem--k4eMk"><div class="ListItem-module__content">'
+            f'<h4 class="Title-module__heading--s7YnL"><a class="Title-module__anchor--GmXUE" '
+            f'href="/google/{name}">{html.escape(name)}</a></h4><p>{html.escape(name)} の説明</p>'
+            f'<div>{lang}<a href="/google/{name}/stargazers" aria-label="{stars} stars">'
+            f'<svg class="octicon octicon-star"></svg>{_format_stars(stars)}</a></div></div></li>')
+
+
+def _item_legacy(name, language, stars):
+    # 以前の一覧（itemprop 属性・stargazers リンクのみ）
+    lang = (f'<span itemprop="programmingLanguage">{html.escape(language)}</span>'
+            if language != "不明" else "")
+    return (f'<li class="public source"><div><h3><a href="/google/{name}" itemprop="name codeRepository">'
+            f'{html.escape(name)}</a></h3><p itemprop="description">{html.escape(name)}</p>'
+            f'<div>{lang}<a class="Link--muted" href="/google/{name}/stargazers">'
+            f'<svg class="octicon octicon-star"></svg> {stars:,}</a></div></div></li>')
+
+
+def make_listing_page(repos, layout="current"):
+    """repos [(名前, 言語, スター数), ...] を1ページ分の一覧 HTML にする"""
+    make_item = _item_current if layout == "current" else _item_legacy
+    nav = "".join(f'<li><a href="/{p}">{p}</a></li>' for p in ("about", "blog", "pricing"))
+    body = "".join(make_item(*repo) for repo in repos)
+    return (f"<html><head><meta charset='utf-8'></head><body><nav><ul>{nav}</ul></nav>"
+            f"<main><ul>{body}</ul></main></body></html>").encode("utf-8")
+
+
+def edge_case_pages():
+    """
+    ページ最初の項目には当たらず、後ろの項目にだけ当たる方法があるページ
+    （(...)[1] を使う方法をページ全体で調べると見落とす）
+    """
+    def page(*items):
+        return f"<html><body><ul>{''.join(items)}</ul></body></html>".encode("utf-8")
+
+    return [
+        # 言語: 1件目の LanguageCircle には隣の span がなく、2件目にはある
+        page('<li><a href="/google/a">a</a><div class="LanguageCircle"></div></li>',
+             '<li><a href="/google/b">b</a><div class="LanguageCircle"></div><span>Rust</span></li>'),
+        # 言語: repository-lang-stats-graph が2件目だけにある
+        page('<li><a href="/google/a">a</a></li>',
+             '<li><a href="/google/b">b</a><div><div data-testid="repository-lang-stats-graph"></div>'
+             '<span>Go</span></div></li>'),
+        # 名前: 1件目の見出し h4 にはリンクがなく、2件目にはある
+        page('<li><h4 class="Title-module__heading--s7YnL">a</h4><a href="/google/a">a</a></li>',
+             '<li><h4 class="Title-module__heading--s7YnL"><a class="Title-module__anchor--GmXUE" '
+             'href="/google/b">b</a></h4></li>'),
+        # スター数: octicon-star が2件目だけにある
+        page('<li><a href="/google/a">a</a></li>',
+             '<li><a href="/google/b">b</a><span><svg class="octicon octicon-star"></svg>12</span></li>'),
+    ]
+
+
+def check_edge_cases():
+    parser = ListingParser()
+    for i, page in enumerate(edge_case_pages()):
+        expected = parse_repositories(page)
+        result = parser.parse(page)
+        if result != expected:
+            raise AssertionError(f"境界ケース {i}: {result} != {expected}")
+    print(f"境界ケース {len(edge_case_pages())} ページ: 出力一致")
+
+
+def synthetic_pages(db_name=DB_NAME):
+    conn = sqlite3.connect(db_name)
+    try:
+        repos = conn.execute(
+            "SELECT repository_name, main_language, star_count FROM repositories ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+    pages = []
+    for i, start in enumerate(range(0, len(repos), PER_PAGE)):
+        layout = "legacy" if i % 4 == 3 else "current"  # 4ページに1ページは旧レイアウト
+        pages.append(make_listing_page(repos[start:start + PER_PAGE], layout))
+    return pages
+
+
+def saved_pages(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+def bench_parse(pages):
+    total = sum(len(p) for p in pages)
+    print(f"一覧ページ {len(pages)} 個（合計 {total / 1024 / 1024:.1f} MB）")
+
+    start = time.perf_counter()
+    expected = [parse_repositories(page) for page in pages]
+    old_sec = time.perf_counter() - start
+
+    parser = ListingParser()
+    start = time.perf_counter()
+    result = [parser.parse(page) for page in pages]
+    new_sec = time.perf_counter() - start
+
+    mismatched = [i for i, (a, b) in enumerate(zip(result, expected)) if a != b]
+    if mismatched:
+        raise AssertionError(f"解析結果が一致しないページ: {mismatched[:10]}")
+
+    page_ms = sorted(s * 1000 for s in parser.stats["page_seconds"])
+    print(f"  BeautifulSoup(html.parser): {old_sec:6.3f}s（1ページ {old_sec / len(pages) * 1000:6.2f} ms）")
+    print(f"  lxml + XPath              : {new_sec:6.3f}s（1ページ {new_sec / len(pages) * 1000:6.2f} ms, "
+          f"最大 {page_ms[-1]:.2f} ms）")
+    print(f"  {old_sec / new_sec:.1f}倍, 出力一致（{sum(len(r) for r in result)} 件）")
+    print(parser.report())
+
+
+if __name__ == "__main__":
+    check_edge_cases()
+    if len(sys.argv) > 1:
+        bench_parse(saved_pages(sys.argv[1]))
+    else:
+        bench_parse(synthetic_pages())
@@ -0,0 +1,201 @@
+"""
+リポジトリ一覧ページの解析（lxml + コンパイル済み XPath 版）。
+
+scraper.parse_repositories（BeautifulSoup / html.parser）と同じ方法を同じ順で試すが、
+- リスト項目の探し方は、ページごとに最初に見つかった方法を1回だけ選ぶ
+- 名前・言語・スター数も、そのページで最初に当たった方法を先に試す（外れた項目だけ他の方法へ）
+- ページの解析時間と、各方法が使われた回数（ヒット率）を stats に記録する
+"""
+import re
+import threading
+import time
+from collections import Counter
+
+from lxml import etree, html as lxml_html
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# リスト項目の探し方（上から順に試し、ページ内で最初に見つかったものを使う）
+ITEM_STRATEGIES = [
+    ("listItem-class", etree.XPath(f"//li[{_has_class('ListItem-module__listItem--k4eMk')}]")),
+    ("data-testid", etree.XPath(
+        "//li[contains(translate(@data-testid, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'),"
+        " 'repository')]")),
+    ("li-with-google-link", etree.XPath("//li[.//a[contains(@href, '/google/')]]")),
+]
+
+# (名前, 項目内で使う XPath[, ページ全体で当たるか調べる XPath])
+# 項目内の XPath が (...)[1] で先頭の要素だけを見る方法は、ページ全体に対して使うと
+# ページ最初の要素しか見ないので、位置指定のない形で調べる
+_NAME = [
+    ("title-anchor", etree.XPath(
+        f"(.//h4[{_has_class('Title-module__heading--s7YnL')}])[1]"
+        f"//a[{_has_class('Title-module__anchor--GmXUE')}]"),
+     etree.XPath(f"//h4[{_has_class('Title-module__heading--s7YnL')}]"
+                 f"//a[{_has_class('Title-module__anchor--GmXUE')}]")),
+    ("itemprop", etree.XPath(".//a[@itemprop = 'name codeRepository']")),
+    ("href", etree.XPath(".//a[starts-with(@href, '/google/')]")),
+]
+_LANGUAGE = [
+    ("text4-class", etree.XPath(f".//span[{_has_class('ReposListItem-module__Text_4--mkG7R')}]")),
+    ("itemprop", etree.XPath(".//span[@itemprop = 'programmingLanguage']")),
+    ("language-circle", etree.XPath(
+        "(.//div[contains(@class, 'LanguageCircle')])[1]/following-sibling::span"),
+     etree.XPath("//div[contains(@class, 'LanguageCircle')]/following-sibling::span")),
+    ("lang-stats-graph", etree.XPath(
+        "((.//div[@data-testid = 'repository-lang-stats-graph'])[1]/..//span)"),
+     etree.XPath("//div[@data-testid = 'repository-lang-stats-graph']/..//span")),
+]
+_STARS = [
+    ("aria-label", etree.XPath(
+        ".//a[contains(translate(@aria-label, 'STAR', 'star'), 'star')]/@aria-label")),
+    ("stargazers", etree.XPath(".//a[contains(@href, 'stargazers')]")),
+    ("octicon-star", etree.XPath(f"(.//*[local-name() = 'svg'][{_has_class('octicon-star')}])[1]/.."),
+     etree.XPath(f"//*[local-name() = 'svg'][{_has_class('octicon-star')}]/..")),
+]
+
+_COUNT = re.compile(r'([\d,]+\.?\d*)\s*([km]?)')
+_ARIA_STARS = re.compile(r'([\d,]+\.?\d*\s*[km]?)\s*star')
+
+
+def parse_count(text):
+    """'1,234' / '2.5k' などからスター数を取り出す（取れなければ 0）"""
+    match = _COUNT.search(text.lower())
+    if not match:
+        return 0
+    try:
+        num = float(match.group(1).replace(',', ''))
+    except ValueError:
+        return 0
+    unit = match.group(2)
+    if unit == 'k':
+        return int(num * 1000)
+    if unit == 'm':
+        return int(num * 1000000)
+    return int(num)
+
+
+def _text(element):
+    return element.text_content().strip()
+
+
+def _name(name, found):
+    if not found:
+        return None
+    return _text(found[0]) or None
+
+
+def _language(name, found):
+    if not found:
+        return None
+    language = _text(found[0])
+    if name == "text4-class" and language == "不明":
+        return None
+    return language
+
+
+def _stars(name, found):
+    if not found:
+        return None
+    if name == "aria-label":
+        match = _ARIA_STARS.search(found[0].lower())
+        return (parse_count(match.group(1)) or None) if match else None
+    if name == "stargazers":
+        return parse_count(_text(found[0])) or None
+    return parse_count(_text(found[0]))
+
+
+class ListingParser:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"pages": 0, "items": 0, "seconds": 0.0, "page_seconds": [], "hits": Counter()}
+
+    def parse(self, html):
+        """一覧ページの HTML から [(リポジトリ名, 言語, スター数), ...] を取り出す"""
+        start = time.perf_counter()
+        if isinstance(html, bytes):
+            root = lxml_html.document_fromstring(html, parser=lxml_html.HTMLParser(encoding="utf-8"))
+        else:
+            root = lxml_html.document_fromstring(html)
+
+        hits = Counter()
+        items = []
+        for name, xpath in ITEM_STRATEGIES:
+            items = xpath(root)
+            if items:
+                hits[("item", name)] += 1
+                break
+
+        # 名前・言語・スター数は、ページ全体で最初に当たる方法から試す。
+        # それより前の方法はこのページのどの項目にも当たらないので、結果は元の優先順位と同じ
+        fields = [("name", _NAME, _name, None), ("language", _LANGUAGE, _language, "不明"),
+                  ("stars", _STARS, _stars, 0)]
+        chosen = [(field, self._from_first_match(root, strategies), convert, default)
+                  for field, strategies, convert, default in fields]
+
+        repositories = []
+        for item in items:
+            values = []
+            for field, strategies, convert, default in chosen:
+                value = self._extract(item, field, strategies, convert, hits, default)
+                if field == "name" and not value:
+                    break
+                values.append(value)
+            else:
+                repositories.append(tuple(values))
+
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.stats["pages"] += 1
+            self.stats["items"] += len(repositories)
+            self.stats["seconds"] += seconds
+            self.stats["page_seconds"].append(seconds)
+            self.stats["hits"].update(hits)
+        return repositories
+
+    @staticmethod
+    def _from_first_match(root, strategies):
+        for i, (_, xpath, *probe) in enumerate(strategies):
+            if (probe[0] if probe else xpath)(root):
+                return strategies[i:]
+        return []
+
+    @staticmethod
+    def _extract(item, field, strategies, convert, hits, default):
+        for name, xpath, *_ in strategies:
+            value = convert(name, xpath(item))
+            if value is not None:
+                hits[(field, name)] += 1
+                return value
+        hits[(field, "none")] += 1
+        return default
+
+    def hit_rates(self):
+        """{(項目, 方法): 割合}。方法の選ばれ方の偏りを見る"""
+        with self._lock:
+            hits = dict(self.stats["hits"])
+        totals = Counter()
+        for (field, _), count in hits.items():
+            totals[field] += count
+        return {key: count / totals[key[0]] for key, count in sorted(hits.items())}
+
+    def report(self):
+        with self._lock:
+            pages = self.stats["pages"]
+            seconds = self.stats["seconds"]
+            items = self.stats["items"]
+        if not pages:
+            return "解析したページはありません。"
+        lines = [f"解析 {pages} ページ / {items} 件: 合計 {seconds * 1000:.1f} ms "
+                 f"（1ページ平均 {seconds / pages * 1000:.2f} ms）"]
+        for (field, name), rate in self.hit_rates().items():
+            lines.append(f"  {field:<8} {name:<20} {rate:6.1%}")
+        return "\n".join(lines)
@@ -0,0 +1,535 @@
+"""
+google_github_scraping.ipynb のスクレイピング処理をモジュールにしたもの。
+
+    python scraper.py               # 前回の続きから取得（終わったページは取り直さない）
+    python scraper.py --restart     # チェックポイントを消して1ページ目から
+    python scraper.py --workers 4   # 同時に取得するページ数の上限
+
+一覧ページは最大 max_workers ページずつ並行して取得する（リクエスト開始の間隔は最低1秒）。
+429/503 が返ったら Retry-After（なければ指数バックオフ）だけ待って再試行し、
+全体のリクエスト間隔も広げる。取得し終わったページは github_repositories.db の
+crawl_pages / crawl_page_items に記録し、次回はそのページを飛ばして再開する。
+repositories テーブルは作り直さず、変わったリポジトリだけを更新して
+repository_snapshots にスター数の履歴を残す。
+"""
+import argparse
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from bs4 import BeautifulSoup
+
+from listing_parser import ListingParser, parse_count
+
+BASE_URL = "https://github.com/orgs/google/repositories"
+MAX_PAGES = 94
+DB_NAME = "github_repositories.db"
+
+# より詳細なヘッダーを設定（ブラウザのように見せる）
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0'
+}
+
+RETRY_STATUSES = (429, 503)
+REQUEST_TIMEOUT = 15
+
+
+def page_url(page, base_url=BASE_URL):
+    if page == 1:
+        return f"{base_url}?tab=repositories"
+    return f"{base_url}?page={page}&tab=repositories"
+
+
+def parse_repositories(html):
+    """
+    一覧ページの HTML から [(リポジトリ名, 言語, スター数), ...] を取り出す（BeautifulSoup 版）。
+    通常は listing_parser.ListingParser を使い、こちらは比較用に残している。
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # リポジトリのリスト項目を取得（複数の方法を試す）
+    repo_items = soup.find_all('li', class_='ListItem-module__listItem--k4eMk')
+    if not repo_items:
+        repo_items = soup.find_all('li', {'data-testid': lambda x: x and 'repository' in str(x).lower()})
+    if not repo_items:
+        repo_items = [item for item in soup.find_all('li')
+                      if item.find('a', href=lambda x: x and '/google/' in str(x))]
+
+    repositories = []
+    for item in repo_items:
+        repo_name = _parse_name(item)
+        if repo_name:
+            repositories.append((repo_name, _parse_language(item), _parse_stars(item)))
+    return repositories
+
+
+def _parse_name(item):
+    # 方法1: h4タグ内のa
+    title_h4 = item.find('h4', class_='Title-module__heading--s7YnL')
+    if title_h4:
+        repo_link = title_h4.find('a', class_='Title-module__anchor--GmXUE')
+        if repo_link and repo_link.get_text().strip():
+            return repo_link.get_text().strip()
+
+    # 方法2: itemprop="name codeRepository"
+    repo_link = item.find('a', {'itemprop': 'name codeRepository'})
+    if repo_link and repo_link.get_text().strip():
+        return repo_link.get_text().strip()
+
+    # 方法3: href="/google/..."のパターン
+    repo_link = item.find('a', href=lambda x: x and x.startswith('/google/'))
+    if repo_link:
+        return repo_link.get_text().strip() or None
+    return None
+
+
+def _parse_language(item):
+    # 方法1: ReposListItem-module__Text_4--mkG7R クラス
+    language_span = item.find('span', class_='ReposListItem-module__Text_4--mkG7R')
+    if language_span:
+        language = language_span.get_text().strip()
+        if language != "不明":
+            return language
+
+    # 方法2: itemprop="programmingLanguage"
+    language_span = item.find('span', {'itemprop': 'programmingLanguage'})
+    if language_span:
+        return language_span.get_text().strip()
+
+    # 方法3: LanguageCircle の隣のspan
+    lang_circle = item.find('div', class_=lambda x: x and 'LanguageCircle' in str(x))
+    if lang_circle and lang_circle.parent:
+        next_span = lang_circle.find_next_sibling('span')
+        if next_span:
+            return next_span.get_text().strip()
+
+    # 方法4: data-testid="repository-lang-stats-graph"
+    lang_div = item.find('div', {'data-testid': 'repository-lang-stats-graph'})
+    if lang_div and lang_div.parent:
+        lang_span = lang_div.parent.find('span')
+        if lang_span:
+            return lang_span.get_text().strip()
+    return "不明"
+
+
+def _parse_stars(item):
+    # 方法1: aria-labelに"star"を含むaタグ（"34 stars" や "2.5k stars"）
+    star_link = item.find('a', {'aria-label': lambda x: x and 'star' in str(x).lower()})
+    if star_link:
+        match = re.search(r'([\d,]+\.?\d*\s*[km]?)\s*star', star_link.get('aria-label', '').lower())
+        if match and parse_count(match.group(1)):
+            return parse_count(match.group(1))
+
+    # 方法2: stargazers へのリンクのテキスト
+    star_link = item.find('a', href=lambda x: x and 'stargazers' in str(x))
+    if star_link:
+        stars = parse_count(star_link.get_text().strip())
+        if stars:
+            return stars
+
+    # 方法3: octicon-star アイコンの隣のテキスト
+    star_svg = item.find('svg', class_='octicon-star')
+    if star_svg and star_svg.parent:
+        return parse_count(star_svg.parent.get_text().strip())
+    return 0
+
+
+class AdaptiveThrottle:
+    """
+    スレッド間で共有するリクエスト間隔。429/503 を受けると間隔を倍にし、
+    成功が続くと少しずつ min_interval まで戻す。
+    """
+
+    def __init__(self, min_interval=1.0, max_interval=60.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        time.sleep(start - now)
+
+    def success(self):
+        with self._lock:
+            self.interval = max(self.min_interval, self.interval * 0.9)
+
+    def throttled(self, retry_after=None):
+        with self._lock:
+            self.interval = min(self.max_interval, self.interval * 2)
+            if retry_after:
+                # サーバーの指定があれば、それまで誰も次のリクエストを始めない
+                self._next_start = max(self._next_start, time.monotonic() + retry_after)
+
+
+class CrawlCheckpoint:
+    """取得し終わったページとその中身を DB に記録する（途中で止まっても続きから再開できる）"""
+
+    def __init__(self, db_name=DB_NAME):
+        self.db_name = db_name
+        self._lock = threading.Lock()
+        conn = sqlite3.connect(self.db_name)
+        try:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_pages (
+                page INTEGER PRIMARY KEY,
+                repo_count INTEGER NOT NULL,
+                finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_page_items (
+                page INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                repository_name TEXT NOT NULL,
+                main_language TEXT,
+                star_count INTEGER,
+                PRIMARY KEY (page, position)
+            )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def load(self):
+        """{ページ番号: [(リポジトリ名, 言語, スター数), ...]}（空のページは一覧の終わり）"""
+        conn = sqlite3.connect(self.db_name)
+        try:
+            pages = {page: [] for (page,) in conn.execute('SELECT page FROM crawl_pages')}
+            rows = conn.execute('''
+                SELECT page, repository_name, main_language, star_count
+                FROM crawl_page_items ORDER BY page, position
+            ''')
+            for page, *repo in rows:
+                pages[page].append(tuple(repo))
+            return pages
+        finally:
+            conn.close()
+
+    def save_page(self, page, repositories):
+        with self._lock:
+            conn = sqlite3.connect(self.db_name)
+            try:
+                with conn:
+                    conn.execute('DELETE FROM crawl_page_items WHERE page = ?', (page,))
+                    conn.executemany(
+                        'INSERT INTO crawl_page_items VALUES (?, ?, ?, ?, ?)',
+                        [(page, i, *repo) for i, repo in enumerate(repositories)]
+                    )
+                    conn.execute('INSERT OR REPLACE INTO crawl_pages (page, repo_count) VALUES (?, ?)',
+                                 (page, len(repositories)))
+            finally:
+                conn.close()
+
+    def clear(self):
+        conn = sqlite3.connect(self.db_name)
+        try:
+            with conn:
+                conn.execute('DELETE FROM crawl_page_items')
+                conn.execute('DELETE FROM crawl_pages')
+        finally:
+            conn.close()
+
+
+class GitHubOrgScraper:
+
+    def __init__(self, base_url=BASE_URL, max_pages=MAX_PAGES, max_workers=4, db_name=DB_NAME,
+                 min_interval=1.0, max_retries=5, backoff_base=2.0, parser="lxml", save_html_dir=None):
+        self.base_url = base_url
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.throttle = AdaptiveThrottle(min_interval)
+        self.checkpoint = CrawlCheckpoint(db_name)
+        self._local = threading.local()
+        self.listing_parser = ListingParser()
+        self.parser = parser  # "lxml"（listing_parser）/ "bs4"（parse_repositories）
+        self.parse = self.listing_parser.parse if parser == "lxml" else parse_repositories
+        self.parse_seconds = {}  # ページ番号 -> 解析にかかった秒数
+        self.save_html_dir = save_html_dir  # 取得した HTML を保存する（ベンチマーク用）
+
+    def _session(self):
+        # Session はスレッドごとに1つ（Cookie・接続を再利用）
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            self._local.session = session
+        return session
+
+    def fetch_page(self, page):
+        """1ページ取得して解析する。取得できなければ None（チェックポイントには残さない）"""
+        url = page_url(page, self.base_url)
+        for attempt in range(self.max_retries + 1):
+            self.throttle.wait()
+            try:
+                res = self._session().get(url, timeout=REQUEST_TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                print(f"[ページ {page}] エラーが発生: {e}")
+                return None
+
+            if res.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                retry_after = self._retry_after(res)
+                delay = retry_after or self.backoff_base * 2 ** attempt * random.uniform(0.5, 1.0)
+                print(f"  [ページ {page}] {res.status_code}エラー: {delay:.1f}秒待機後に再試行...")
+                self.throttle.throttled(retry_after)
+                time.sleep(delay)
+                continue
+            if res.status_code != 200:
+                print(f"[ページ {page}] アクセス失敗 (ステータスコード: {res.status_code})")
+                return None
+
+            self.throttle.success()
+            res.encoding = 'utf-8'
+            if self.save_html_dir:
+                os.makedirs(self.save_html_dir, exist_ok=True)
+                with open(os.path.join(self.save_html_dir, f"page_{page:03d}.html"), "wb") as f:
+                    f.write(res.content)
+            start = time.perf_counter()
+            repositories = self.parse(res.content)
+            self.parse_seconds[page] = time.perf_counter() - start
+            return repositories
+        return None
+
+    @staticmethod
+    def _retry_after(res):
+        try:
+            return float(res.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+    def crawl(self, resume=True):
+        """
+        全ページを取得して ([(リポジトリ名, 言語, スター数), ...], 全ページ取得できたか) を返す。
+        リポジトリ名の重複は最初の1件だけ残す。
+        resume=True なら前回までに取得済みのページは取り直さない。
+        リポジトリが見つからないページが出たら、それより後のページは使わない。
+        """
+        if not resume:
+            self.checkpoint.clear()
+        done = self.checkpoint.load()
+        if done:
+            print(f"チェックポイントから再開: 取得済み {len(done)} ページ")
+        last_page = min((p for p, repos in done.items() if not repos), default=self.max_pages + 1) - 1
+        last_page = min(last_page, self.max_pages)
+        todo = iter([p for p in range(1, last_page + 1) if p not in done])
+
+        print(f"ページを開いています: {self.base_url}\n")
+        failed = False
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+
+            def submit_next():
+                # 取得に失敗したページが出たら新しいページは始めない（続きは次回の実行で）
+                for page in todo if not failed else ():
+                    if page <= last_page:
+                        running[pool.submit(self.fetch_page, page)] = page
+                        return
+
+            for _ in range(self.max_workers):
+                submit_next()
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    page = running.pop(future)
+                    repositories = future.result()
+                    if repositories is None:
+                        failed = True
+                        continue
+                    if page > last_page:
+                        continue
+                    self.checkpoint.save_page(page, repositories)
+                    done[page] = repositories
+                    if repositories:
+                        print(f"ページ {page} 完了: {len(repositories)}件"
+                              f"（解析 {self.parse_seconds.get(page, 0) * 1000:.1f} ms）")
+                    else:
+                        print(f"[ページ {page}] リポジトリが見つかりません。全ページ読み込み完了")
+                        last_page = min(last_page, page - 1)
+                    submit_next()
+
+        missing = [p for p in range(1, last_page + 1) if p not in done]
+        if missing:
+            print(f"未取得のページがあります: {missing}（再実行すると続きから取得します）")
+
+        # 重複を避けるために辞書で管理（ページ順）
+        repositories_dict = {}
+        for page in sorted(done):
+            if page <= last_page:
+                for repo in done[page]:
+                    repositories_dict.setdefault(repo[0], repo)
+        repositories = list(repositories_dict.values())
+        print(f"取得完了。 {len(repositories)} 個のリポジトリを取得しました")
+        if self.parser == "lxml":
+            print(self.listing_parser.report())
+        return repositories, not missing
+
+
+def _create_tables(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS repositories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        repository_name TEXT NOT NULL UNIQUE,
+        main_language TEXT,
+        star_count INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    # 変化があったリポジトリだけを記録するスター数の履歴（star_delta は前回値との差、新規は NULL）
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS repository_snapshots (
+        repository_name TEXT NOT NULL,
+        scraped_at TIMESTAMP NOT NULL,
+        star_count INTEGER,
+        main_language TEXT,
+        star_delta INTEGER,
+        PRIMARY KEY (repository_name, scraped_at)
+    ) WITHOUT ROWID
+    ''')
+    # 「前回からの急上昇」: scraped_at で絞って star_delta 順に読むだけで済むようにする
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_snapshots_movers
+    ON repository_snapshots (scraped_at, star_delta)
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS scrape_runs (
+        scraped_at TIMESTAMP PRIMARY KEY,
+        repo_count INTEGER,
+        inserted INTEGER,
+        updated INTEGER,
+        deleted INTEGER
+    )
+    ''')
+
+
+def save_repositories(repositories, db_name=DB_NAME):
+    """
+    repository_name をキーに、新しいリポジトリだけ追加・言語かスター数が変わったものだけ更新する
+    （変わっていないリポジトリには書き込まない）。今回の一覧にないリポジトリは削除する。
+    追加・更新したものは repository_snapshots に履歴として残す。
+    {"inserted", "updated", "unchanged", "deleted"} の件数を返す。
+    """
+    scraped_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+    conn = sqlite3.connect(db_name)
+    try:
+        with conn:
+            _create_tables(conn)
+            existing = {name: (language, stars) for name, language, stars in conn.execute(
+                'SELECT repository_name, main_language, star_count FROM repositories')}
+
+            inserts, updates, snapshots = [], [], []
+            seen = set()
+            for name, language, stars in repositories:
+                seen.add(name)
+                old = existing.get(name)
+                if old is None:
+                    inserts.append((name, language, stars))
+                    snapshots.append((name, scraped_at, stars, language, None))
+                elif old != (language, stars):
+                    updates.append((language, stars, name))
+                    delta = stars - old[1] if old[1] is not None else None
+                    snapshots.append((name, scraped_at, stars, language, delta))
+            deletes = [(name,) for name in existing if name not in seen]
+
+            conn.executemany(
+                'INSERT INTO repositories (repository_name, main_language, star_count) VALUES (?, ?, ?)',
+                inserts
+            )
+            conn.executemany(
+                'UPDATE repositories SET main_language = ?, star_count = ? WHERE repository_name = ?',
+                updates
+            )
+            conn.executemany('DELETE FROM repositories WHERE repository_name = ?', deletes)
+            conn.executemany('INSERT OR REPLACE INTO repository_snapshots VALUES (?, ?, ?, ?, ?)', snapshots)
+            conn.execute('INSERT OR REPLACE INTO scrape_runs VALUES (?, ?, ?, ?, ?)',
+                         (scraped_at, len(repositories), len(inserts), len(updates), len(deletes)))
+    finally:
+        conn.close()
+
+    counts = {"inserted": len(inserts), "updated": len(updates),
+              "unchanged": len(repositories) - len(inserts) - len(updates), "deleted": len(deletes)}
+    print(f"データベースに保存しました: 新規 {counts['inserted']} 件, 更新 {counts['updated']} 件, "
+          f"変更なし {counts['unchanged']} 件, 削除 {counts['deleted']} 件")
+    return counts
+
+
+def top_movers(db_name=DB_NAME, limit=10, since=None):
+    """
+    スター数が増えたリポジトリの上位 [(リポジトリ名, 言語, 増加数, 現在のスター数), ...]。
+    since=None なら直近の実行での増加、since を指定するとその時刻より後の実行の合計。
+    """
+    conn = sqlite3.connect(db_name)
+    try:
+        _create_tables(conn)
+        if since is None:
+            row = conn.execute('SELECT MAX(scraped_at) FROM scrape_runs').fetchone()
+            if row[0] is None:
+                return []
+            return conn.execute('''
+                SELECT repository_name, main_language, star_delta, star_count
+                FROM repository_snapshots
+                WHERE scraped_at = ? AND star_delta > 0
+                ORDER BY star_delta DESC
+                LIMIT ?
+            ''', (row[0], limit)).fetchall()
+        return conn.execute('''
+            SELECT s.repository_name, r.main_language, SUM(s.star_delta) AS gained, r.star_count
+            FROM repository_snapshots s
+            JOIN repositories r ON r.repository_name = s.repository_name
+            WHERE s.scraped_at > ? AND s.star_delta IS NOT NULL
+            GROUP BY s.repository_name
+            HAVING gained > 0
+            ORDER BY gained DESC
+            LIMIT ?
+        ''', (since, limit)).fetchall()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Google組織のリポジトリ一覧を取得する")
+    parser.add_argument("--workers", type=int, default=4, help="同時に取得するページ数の上限")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    parser.add_argument("--restart", action="store_true", help="チェックポイントを消して最初から")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--parser", choices=["lxml", "bs4"], default="lxml")
+    parser.add_argument("--save-html", metavar="DIR", help="取得した一覧ページの HTML を保存する")
+    args = parser.parse_args()
+
+    scraper = GitHubOrgScraper(max_pages=args.max_pages, max_workers=args.workers, db_name=args.db,
+                               parser=args.parser, save_html_dir=args.save_html)
+    repositories, complete = scraper.crawl(resume=not args.restart)
+    if repositories and complete:
+        save_repositories(repositories, args.db)
+        # 全ページ取り終えて保存できたら、次回は1ページ目から取り直す
+        scraper.checkpoint.clear()
+
+        movers = top_movers(args.db)
+        if movers:
+            print("「SELECT文実行」前回からスター数が増えたリポジトリ:")
+            print(f"{'順位':<5} {'リポジトリ名':<40} {'言語':<15} {'増加':>8} {'スター数':>10}")
+            for i, (name, language, delta, stars) in enumerate(movers, 1):
+                print(f"{i:<5} {name:<40} {language:<15} {delta:>+8,} {stars:>10,}")
+    elif repositories:
+        print("取得が途中のため、repositories テーブルは更新しません。")
+    else:
+        print("\n取得したデータがありません。")
@@ -1,6 +1,9 @@
+import threading
 import flet as ft
 import jma_api
 import db  
+from forecast_cache import ForecastCache
+from icon_cache import IconCache
 
 def main(page: ft.Page):
     page.title = "天気予報アプリ (DB 追加)"
@@ -10,12 +13,22 @@ def main(page: ft.Page):
     page.padding = 0
 
     db.init_db()
+    forecast_cache = ForecastCache()
+    icon_cache = IconCache()
 
-    area_data = jma_api.get_area_data()
+    # Render from the local snapshot; refresh_areas() updates it in the background
+    area_data = jma_api.load_area_snapshot()
 
     def create_card(forecast):
         min_c = "blue200" if forecast["min"] != "-" else "grey"
         max_c = "red200" if forecast["max"] != "-" else "grey"
+
+        # Called under render_lock: icons were prefetched before, so never download here
+        icon_base64 = icon_cache.get_base64(forecast["icon"], download=False)
+        if icon_base64:
+            icon = ft.Image(src_base64=icon_base64, width=70, height=70)
+        else:
+            icon = ft.Image(src=forecast["icon"], width=70, height=70)
         
         return ft.Container(
             width=180, height=220,
@@ -26,7 +39,7 @@ def main(page: ft.Page):
                 [
                     ft.Text(forecast["date"], weight="bold", size=16),
                     ft.Container(height=10),
-                    ft.Image(src=forecast["icon"], width=70, height=70),
+                    icon,
                     ft.Container(height=10),
                     ft.Text(forecast["weather"], size=12, text_align="center", no_wrap=False),
                     ft.Container(expand=True),
@@ -59,58 +72,98 @@ def main(page: ft.Page):
         )
     )
 
+    # Each click bumps the token; loads started by older clicks stop rendering
+    load_state = {"token": 0}
+    render_lock = threading.Lock()
+
+    def render(token, items, loading=False):
+        if items:
+            icon_cache.prefetch(item["icon"] for item in items)
+        with render_lock:
+            if load_state["token"] != token:
+                return False
+            weather_grid.controls.clear()
+            if items:
+                for item in items:
+                    weather_grid.controls.append(create_card(item))
+            elif not loading:
+                weather_grid.controls.append(ft.Text("データ取得エラー (またはDBエラー)"))
+            if loading:
+                weather_grid.controls.append(ft.ProgressRing())
+            page.update()
+            return True
+
+    def load_forecasts(code, token):
+        cached = forecast_cache.get(code)
+        if cached is not None:
+            render(token, cached)
+            return
+
+        # Show whatever the DB already has while the fresh data downloads
+        stale = db.get_forecasts(code)
+        if stale and not render(token, stale, loading=True):
+            return
+
+        report_time, api_data = jma_api.fetch_weather_report(code)
+        if api_data:
+            forecast_cache.put(code, report_time, api_data)
+            db.save_forecasts(code, api_data)
+            db.archive_forecasts(code, report_time, api_data)
+
+        if load_state["token"] != token:
+            return
+        render(token, db.get_forecasts(code))
+
     def on_click(e):
         name = e.control.title.value
         code = e.control.data
-        
-        header.value = f"{name} の天気予報"
-        weather_grid.controls.clear()
-        weather_grid.controls.append(ft.ProgressRing())
-        page.update()
-        
-        api_data = jma_api.fetch_weather_data(code)
-        
-        if api_data:
-            db.save_forecasts(code, api_data)
-        
-        db_data = db.get_forecasts(code)
-        
-        weather_grid.controls.clear()
-        if db_data:
-            for item in db_data:
-                weather_grid.controls.append(create_card(item))
-        else:
-            weather_grid.controls.append(ft.Text("データ取得エラー (またはDBエラー)"))
-        
-        page.update()
-
-    sidebar_items = []
-    sidebar_items.append(ft.Container(padding=15, content=ft.Text("地域を選択", size=14, weight="bold", color="grey")))
-
-    for region, prefs in area_data.items():
-        tiles = []
-        for p_name, p_code in prefs.items():
-            tiles.append(
-                ft.ListTile(
-                    title=ft.Text(p_name, size=14),
-                    data=p_code,
-                    on_click=on_click
+
+        with render_lock:
+            load_state["token"] += 1
+            token = load_state["token"]
+            header.value = f"{name} の天気予報"
+            weather_grid.controls.clear()
+            weather_grid.controls.append(ft.ProgressRing())
+            page.update()
+
+        page.run_thread(load_forecasts, code, token)
+
+    sidebar_list = ft.ListView(padding=10)
+
+    def build_sidebar(area_data):
+        sidebar_items = []
+        sidebar_items.append(ft.Container(padding=15, content=ft.Text("地域を選択", size=14, weight="bold", color="grey")))
+
+        if not area_data:
+            sidebar_items.append(ft.Container(padding=15, content=ft.Text("地域データを読み込み中...", size=12, color="grey")))
+
+        for region, prefs in area_data.items():
+            tiles = []
+            for p_name, p_code in prefs.items():
+                tiles.append(
+                    ft.ListTile(
+                        title=ft.Text(p_name, size=14),
+                        data=p_code,
+                        on_click=on_click
+                    )
+                )
+            
+            sidebar_items.append(
+                ft.ExpansionTile(
+                    title=ft.Text(region),
+                    controls=tiles,
+                    text_color="white",
+                    collapsed_text_color="white70"
                 )
             )
-        
-        sidebar_items.append(
-            ft.ExpansionTile(
-                title=ft.Text(region),
-                controls=tiles,
-                text_color="white",
-                collapsed_text_color="white70"
-            )
-        )
+        sidebar_list.controls = sidebar_items
+
+    build_sidebar(area_data)
 
     sidebar = ft.Container(
         width=250,
         bgcolor="#1f2329",
-        content=ft.ListView(controls=sidebar_items, padding=10),
+        content=sidebar_list,
         border=ft.border.only(right=ft.BorderSide(1, "grey900"))
     )
 
@@ -118,5 +171,13 @@ def main(page: ft.Page):
         ft.Row([sidebar, main_area], spacing=0, expand=True)
     )
 
+    def refresh_areas():
+        fresh = jma_api.refresh_area_snapshot()
+        if fresh and fresh != area_data:
+            build_sidebar(fresh)
+            page.update()
+
+    page.run_thread(refresh_areas)
+
 if __name__ == "__main__":
     ft.app(target=main)
\ No newline at end of file
@@ -1,12 +1,250 @@
 import sqlite3
+import threading
 
 DB_NAME = "weather.db"
 
+class WeatherStorage:
+    """
+    Keeps one long-lived SQLite connection per thread (UI thread, loader
+    threads, ...) instead of reconnecting on every call.
+    The database runs in WAL mode so readers never block the writer.
+    """
+
+    def __init__(self, db_name=DB_NAME):
+        self.db_name = db_name
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-8000")  # ~8 MB page cache
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def init_db(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS forecasts (
+                    area_code TEXT,
+                    date TEXT,
+                    weather TEXT,
+                    icon TEXT,
+                    min_temp TEXT,
+                    max_temp TEXT,
+                    PRIMARY KEY (area_code, date)
+                )
+            """)
+            # Append-only history: one row per (area, JMA report, forecast date).
+            # WITHOUT ROWID stores rows clustered by area and then report time.
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS forecast_archive (
+                    area_code TEXT NOT NULL,
+                    report_datetime TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    weather TEXT,
+                    icon TEXT,
+                    min_temp REAL,
+                    max_temp REAL,
+                    PRIMARY KEY (area_code, report_datetime, date)
+                ) WITHOUT ROWID
+            """)
+            # Covering index for "how did the forecast for this date evolve"
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_archive_evolution
+                ON forecast_archive (area_code, date, report_datetime, weather, min_temp, max_temp)
+            """)
+
+    def save_forecasts(self, area_code, forecast_list):
+        """
+        Saves a list of forecast dictionaries to the DB.
+        Uses 'INSERT OR REPLACE' to update existing data if fetched again.
+        """
+        self.save_many({area_code: forecast_list})
+
+    def save_many(self, forecasts_by_area):
+        """Upserts {area_code: forecast_list} for many offices in one transaction."""
+        rows = [
+            (area_code, item["date"], item["weather"], item["icon"], item["min"], item["max"])
+            for area_code, forecast_list in forecasts_by_area.items()
+            for item in forecast_list
+        ]
+        conn = self.connection()
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO forecasts (area_code, date, weather, icon, min_temp, max_temp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+
+    def archive_forecasts(self, area_code, report_datetime, forecast_list):
+        """
+        Appends one JMA report to forecast_archive. Temperatures are stored as
+        numbers (NULL instead of "-"); saving the same report twice is a no-op.
+        """
+        if not report_datetime:
+            return
+        rows = [
+            (area_code, report_datetime, item["date"], item["weather"], item["icon"],
+             _to_temp(item["min"]), _to_temp(item["max"]))
+            for item in forecast_list
+        ]
+        conn = self.connection()
+        with conn:
+            conn.executemany("""
+                INSERT OR IGNORE INTO forecast_archive
+                    (area_code, report_datetime, date, weather, icon, min_temp, max_temp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+    def save_reports(self, reports):
+        """
+        Writes {area_code: (report_datetime, forecast_list)} to both the
+        forecasts table and the archive in a single transaction.
+        """
+        current_rows = []
+        archive_rows = []
+        for area_code, (report_datetime, forecast_list) in reports.items():
+            for item in forecast_list:
+                current_rows.append((area_code, item["date"], item["weather"], item["icon"],
+                                     item["min"], item["max"]))
+                if report_datetime:
+                    archive_rows.append((area_code, report_datetime, item["date"], item["weather"],
+                                         item["icon"], _to_temp(item["min"]), _to_temp(item["max"])))
+        conn = self.connection()
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO forecasts (area_code, date, weather, icon, min_temp, max_temp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, current_rows)
+            conn.executemany("""
+                INSERT OR IGNORE INTO forecast_archive
+                    (area_code, report_datetime, date, weather, icon, min_temp, max_temp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, archive_rows)
+
+    def get_latest_archived(self, area_code):
+        """Returns the forecasts of the most recent archived report for an area."""
+        rows = self.connection().execute("""
+            SELECT report_datetime, date, weather, icon, min_temp, max_temp
+            FROM forecast_archive
+            WHERE area_code = ?
+              AND report_datetime = (
+                  SELECT MAX(report_datetime) FROM forecast_archive WHERE area_code = ?
+              )
+            ORDER BY date ASC
+        """, (area_code, area_code)).fetchall()
+
+        return [
+            {"report_datetime": row[0], "date": row[1], "weather": row[2],
+             "icon": row[3], "min": row[4], "max": row[5]}
+            for row in rows
+        ]
+
+    def get_forecast_history(self, area_code, date):
+        """Returns every archived forecast for one date, oldest report first."""
+        rows = self.connection().execute("""
+            SELECT report_datetime, weather, min_temp, max_temp
+            FROM forecast_archive
+            WHERE area_code = ? AND date = ?
+            ORDER BY report_datetime ASC
+        """, (area_code, date)).fetchall()
+
+        return [
+            {"report_datetime": row[0], "weather": row[1], "min": row[2], "max": row[3]}
+            for row in rows
+        ]
+
+    def get_forecasts(self, area_code):
+        """Retrieves weather data from the DB for a specific area."""
+        rows = self.connection().execute("""
+            SELECT date, weather, icon, min_temp, max_temp
+            FROM forecasts
+            WHERE area_code = ?
+            ORDER BY date ASC
+        """, (area_code,)).fetchall()
+
+        return [
+            {"date": row[0], "weather": row[1], "icon": row[2], "min": row[3], "max": row[4]}
+            for row in rows
+        ]
+
+def _to_temp(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+_storage = WeatherStorage()
+
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
+    _storage.init_db()
+
+def save_forecasts(area_code, forecast_list):
+    _storage.save_forecasts(area_code, forecast_list)
+
+def save_many(forecasts_by_area):
+    _storage.save_many(forecasts_by_area)
+
+def get_forecasts(area_code):
+    return _storage.get_forecasts(area_code)
+
+def save_reports(reports):
+    _storage.save_reports(reports)
+
+def archive_forecasts(area_code, report_datetime, forecast_list):
+    _storage.archive_forecasts(area_code, report_datetime, forecast_list)
+
+def get_latest_archived(area_code):
+    return _storage.get_latest_archived(area_code)
+
+def get_forecast_history(area_code, date):
+    return _storage.get_forecast_history(area_code, date)
+
+if __name__ == "__main__":
+    # Bulk upsert benchmark: 58 offices x 7 days, old per-row path vs WeatherStorage
+    import os
+    import tempfile
+    import time
+
+    batch = {
+        f"{130000 + i * 10:06d}": [
+            {"date": f"2025-12-{d:02d}", "weather": "晴れ", "icon": "100.svg", "min": "5", "max": "12"}
+            for d in range(1, 8)
+        ]
+        for i in range(58)
+    }
+    tmp = tempfile.mkdtemp()
+
+    def old_save(db_name, area_code, forecast_list):
+        conn = sqlite3.connect(db_name)
+        for item in forecast_list:
+            conn.execute("""
+                INSERT OR REPLACE INTO forecasts (area_code, date, weather, icon, min_temp, max_temp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (area_code, item["date"], item["weather"], item["icon"], item["min"], item["max"]))
+        conn.commit()
+        conn.close()
+
+    # Baseline schema created the original way: a plain connection, so the file
+    # keeps the default rollback journal (WAL would persist in the file).
+    old_db = os.path.join(tmp, "old.db")
+    conn = sqlite3.connect(old_db)
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS forecasts (
             area_code TEXT,
             date TEXT,
@@ -19,53 +257,25 @@ def init_db():
     """)
     conn.commit()
     conn.close()
+    start = time.perf_counter()
+    for _ in range(10):
+        for code, items in batch.items():
+            old_save(old_db, code, items)
+    old_ms = (time.perf_counter() - start) / 10 * 1000
 
-def save_forecasts(area_code, forecast_list):
-    """
-    Saves a list of forecast dictionaries to the DB.
-    Uses 'INSERT OR REPLACE' to update existing data if fetched again.
-    """
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    for item in forecast_list:
-        cursor.execute("""
-            INSERT OR REPLACE INTO forecasts (area_code, date, weather, icon, min_temp, max_temp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            area_code,
-            item["date"],
-            item["weather"],
-            item["icon"],
-            item["min"],
-            item["max"]
-        ))
-    
-    conn.commit()
-    conn.close()
+    storage = WeatherStorage(os.path.join(tmp, "new.db"))
+    storage.init_db()
+    start = time.perf_counter()
+    for _ in range(10):
+        for code, items in batch.items():
+            storage.save_forecasts(code, items)
+    per_area_ms = (time.perf_counter() - start) / 10 * 1000
 
-def get_forecasts(area_code):
-    """Retrieves weather data from the DB for a specific area."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT date, weather, icon, min_temp, max_temp 
-        FROM forecasts 
-        WHERE area_code = ? 
-        ORDER BY date ASC
-    """, (area_code,))
-    
-    rows = cursor.fetchall()
-    conn.close()
+    start = time.perf_counter()
+    for _ in range(10):
+        storage.save_many(batch)
+    bulk_ms = (time.perf_counter() - start) / 10 * 1000
 
-    results = []
-    for row in rows:
-        results.append({
-            "date": row[0],
-            "weather": row[1],
-            "icon": row[2],
-            "min": row[3],
-            "max": row[4]
-        })
-    return results
\ No newline at end of file
+    print(f"connect per call, row-by-row : {old_ms:8.2f} ms")
+    print(f"WeatherStorage, per office   : {per_area_ms:8.2f} ms")
+    print(f"WeatherStorage.save_many     : {bulk_ms:8.2f} ms")
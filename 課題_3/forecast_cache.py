@@ -0,0 +1,136 @@
+import datetime
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = "forecast_cache"
+
+JST = datetime.timezone(datetime.timedelta(hours=9))
+# JMA republishes the office forecasts at 05:00, 11:00 and 17:00 JST
+PUBLISH_HOURS = (5, 11, 17)
+# Used when the expected slot already passed but JMA has not published yet
+MIN_TTL = 5 * 60
+
+def next_publish_time(report_datetime, now=None):
+    """
+    Returns the epoch time when the forecast published at report_datetime
+    is expected to be replaced (the next publish slot), but never sooner
+    than MIN_TTL from now.
+    """
+    now = time.time() if now is None else now
+    try:
+        published = datetime.datetime.fromisoformat(report_datetime).astimezone(JST)
+    except (TypeError, ValueError):
+        published = datetime.datetime.fromtimestamp(now, JST)
+
+    day = published.replace(minute=0, second=0, microsecond=0)
+    for hour in PUBLISH_HOURS:
+        slot = day.replace(hour=hour)
+        if slot > published:
+            break
+    else:
+        slot = day.replace(hour=PUBLISH_HOURS[0]) + datetime.timedelta(days=1)
+
+    return max(slot.timestamp(), now + MIN_TTL)
+
+class ForecastCache:
+    """
+    Two-level cache for forecast lists keyed by area code:
+    an in-process LRU in front of one JSON file per area on disk.
+    Entries expire at the next expected JMA publish slot.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_entries=64, max_disk_entries=256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # area_code -> entry
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, area_code):
+        return os.path.join(self.cache_dir, f"{area_code}.json")
+
+    def get(self, area_code):
+        """Returns the cached forecast list, or None if missing/expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(area_code)
+            if entry and entry["expires_at"] > now:
+                self._memory.move_to_end(area_code)
+                self.hits += 1
+                return entry["forecasts"]
+
+        entry = self._read_disk(area_code)
+        with self._lock:
+            if entry and entry["expires_at"] > now:
+                self._remember(area_code, entry)
+                self.disk_hits += 1
+                return entry["forecasts"]
+            self._memory.pop(area_code, None)
+            self.misses += 1
+            return None
+
+    def put(self, area_code, report_datetime, forecasts):
+        entry = {
+            "report_datetime": report_datetime,
+            "expires_at": next_publish_time(report_datetime),
+            "forecasts": forecasts,
+        }
+        with self._lock:
+            self._remember(area_code, entry)
+        self._write_disk(area_code, entry)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._memory),
+            }
+
+    def _remember(self, area_code, entry):
+        self._memory[area_code] = entry
+        self._memory.move_to_end(area_code)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, area_code):
+        path = self._path(area_code)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mtime doubles as last-used time for eviction
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, area_code, entry):
+        path = self._path(area_code)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self._evict_disk()
+        except OSError as e:
+            print(f"Cache write error: {e}")
+
+    def _evict_disk(self):
+        """Drops the least recently used (read or written) files beyond max_disk_entries."""
+        files = [os.path.join(self.cache_dir, name)
+                 for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
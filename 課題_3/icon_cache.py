@@ -0,0 +1,125 @@
+import base64
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jma_api
+
+ICON_DIR = "icons"
+# After a failed download, don't try the same icon again for this long
+FAILURE_TTL = 60
+
+def icon_code(icon_url):
+    """'https://.../img/101.svg' -> '101'"""
+    return os.path.splitext(os.path.basename(icon_url))[0]
+
+class IconCache:
+    """
+    Weather icons stored once per weather code: base64 strings in a
+    byte-bounded in-memory LRU, SVG files on disk (also size-bounded).
+    Only icons that are in neither place are downloaded from JMA; icons whose
+    download failed are not retried for FAILURE_TTL seconds.
+    """
+
+    def __init__(self, icon_dir=ICON_DIR, max_memory_bytes=2 * 1024 * 1024,
+                 max_disk_bytes=8 * 1024 * 1024):
+        self.icon_dir = icon_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # code -> base64 str
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self._failed = {}  # code -> time after which the download may be retried
+        os.makedirs(icon_dir, exist_ok=True)
+
+    def _path(self, code):
+        return os.path.join(self.icon_dir, f"{code}.svg")
+
+    def get_base64(self, icon_url, download=True):
+        """
+        Base64 SVG for an icon URL (for ft.Image(src_base64=...)), None if unavailable.
+        download=False only looks in memory and on disk (no network, safe under a UI lock).
+        """
+        code = icon_code(icon_url)
+        with self._lock:
+            encoded = self._memory.get(code)
+            if encoded is not None:
+                self._memory.move_to_end(code)
+                return encoded
+
+        data = self._read_disk(code)
+        if data is None:
+            if not download:
+                return None
+            with self._lock:
+                if self._failed.get(code, 0) > time.monotonic():
+                    return None
+            data = jma_api.fetch_icon(icon_url)
+            if data is None:
+                with self._lock:
+                    self._failed[code] = time.monotonic() + FAILURE_TTL
+                return None
+            self.downloads += 1
+            with self._lock:
+                self._failed.pop(code, None)
+            self._write_disk(code, data)
+
+        encoded = base64.b64encode(data).decode("ascii")
+        with self._lock:
+            self._remember(code, encoded)
+        return encoded
+
+    def prefetch(self, icon_urls):
+        for url in set(icon_urls):
+            self.get_base64(url)
+
+    def _remember(self, code, encoded):
+        old = self._memory.pop(code, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[code] = encoded
+        self._memory_bytes += len(encoded)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _read_disk(self, code):
+        path = self._path(code)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime doubles as last-used time for eviction
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, code, data):
+        path = self._path(code)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._evict_disk()
+        except OSError as e:
+            print(f"Icon cache write error: {e}")
+
+    def _evict_disk(self):
+        """Removes least recently used icons until the folder fits max_disk_bytes."""
+        files = []
+        for name in os.listdir(self.icon_dir):
+            if name.endswith(".svg"):
+                path = os.path.join(self.icon_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
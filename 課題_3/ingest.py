@@ -0,0 +1,144 @@
+"""
+Headless forecast ingestion: polls every office right after each JMA
+publish slot and writes the results to weather.db and the forecast cache,
+so the Flet app can just read them.
+
+    python ingest.py            # run forever
+    python ingest.py --once     # one cycle, then exit
+"""
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import jma_api
+from forecast_cache import ForecastCache, JST, next_publish_time
+
+STATUS_FILE = "ingest_status.json"
+REQUEST_INTERVAL = 0.5    # seconds between request starts
+PUBLISH_DELAY = 10 * 60   # JMA files can appear a few minutes after the slot
+
+class IngestDaemon:
+
+    def __init__(self, storage=None, cache=None, request_interval=REQUEST_INTERVAL,
+                 status_file=STATUS_FILE):
+        self.storage = storage or db.WeatherStorage()
+        self.cache = cache or ForecastCache()
+        self.request_interval = request_interval
+        self.status_file = status_file
+        self._lock = threading.Lock()
+        self.metrics = {
+            "cycles": 0,
+            "offices_ok": 0,
+            "offices_failed": 0,
+            "last_cycle_started": None,
+            "last_cycle_seconds": None,
+            "last_cycle_ok": 0,
+            "last_cycle_failed": 0,
+            "fetch_latency_avg_ms": None,
+            "fetch_latency_max_ms": None,
+            "last_error": None,
+            "next_run": None,
+        }
+        self.storage.init_db()
+
+    def _fetch(self, area_code):
+        start = time.perf_counter()
+        report_datetime, forecasts = jma_api.fetch_weather_report(area_code)
+        return area_code, report_datetime, forecasts, time.perf_counter() - start
+
+    def run_once(self, area_codes=None):
+        """Fetches all offices (paced by request_interval) and stores them in one transaction."""
+        if area_codes is None:
+            area_data = jma_api.refresh_area_snapshot() or jma_api.load_area_snapshot()
+            area_codes = [code for prefs in area_data.values() for code in prefs.values()]
+        area_codes = list(dict.fromkeys(area_codes))
+
+        started = time.time()
+        futures = []
+        with ThreadPoolExecutor(max_workers=jma_api.MAX_WORKERS) as pool:
+            for i, code in enumerate(area_codes):
+                if i:
+                    time.sleep(self.request_interval)
+                futures.append(pool.submit(self._fetch, code))
+
+        reports = {}
+        latencies = []
+        failed = []
+        for future in futures:
+            code, report_datetime, forecasts, seconds = future.result()
+            latencies.append(seconds)
+            if forecasts:
+                reports[code] = (report_datetime, forecasts)
+            else:
+                failed.append(code)
+
+        error = None
+        try:
+            self.storage.save_reports(reports)
+            for code, (report_datetime, forecasts) in reports.items():
+                self.cache.put(code, report_datetime, forecasts)
+        except Exception as e:
+            error = f"DB Error: {e}"
+            failed.extend(reports)
+            reports = {}
+
+        if failed and error is None:
+            error = f"No data for {len(failed)} offices: {', '.join(failed[:5])}"
+
+        with self._lock:
+            m = self.metrics
+            m["cycles"] += 1
+            m["offices_ok"] += len(reports)
+            m["offices_failed"] += len(failed)
+            m["last_cycle_started"] = datetime.datetime.fromtimestamp(started, JST).isoformat()
+            m["last_cycle_seconds"] = round(time.time() - started, 2)
+            m["last_cycle_ok"] = len(reports)
+            m["last_cycle_failed"] = len(failed)
+            if latencies:
+                m["fetch_latency_avg_ms"] = round(sum(latencies) / len(latencies) * 1000, 1)
+                m["fetch_latency_max_ms"] = round(max(latencies) * 1000, 1)
+            if error:
+                m["last_error"] = error
+        self._write_status()
+        print(f"Cycle done: {len(reports)} ok, {len(failed)} failed in {self.metrics['last_cycle_seconds']}s")
+        return reports
+
+    def run_forever(self):
+        while True:
+            self.run_once()
+            wake = next_publish_time(None) + PUBLISH_DELAY
+            with self._lock:
+                self.metrics["next_run"] = datetime.datetime.fromtimestamp(wake, JST).isoformat()
+            self._write_status()
+            time.sleep(max(0, wake - time.time()))
+
+    def get_metrics(self):
+        with self._lock:
+            return dict(self.metrics)
+
+    def _write_status(self):
+        tmp = f"{self.status_file}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.get_metrics(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.status_file)
+        except OSError as e:
+            print(f"Status write error: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JMA forecast ingestion daemon")
+    parser.add_argument("--once", action="store_true", help="run one cycle and exit")
+    parser.add_argument("--interval", type=float, default=REQUEST_INTERVAL,
+                        help="seconds between requests")
+    args = parser.parse_args()
+
+    daemon = IngestDaemon(request_interval=args.interval)
+    if args.once:
+        daemon.run_once()
+    else:
+        daemon.run_forever()
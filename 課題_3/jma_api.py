@@ -1,16 +1,115 @@
 import requests
-import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+import jma_parser
 
 AREA_URL = "http://www.jma.go.jp/bosai/common/const/area.json"
 FORECAST_URL_TEMPLATE = "https://www.jma.go.jp/bosai/forecast/data/forecast/{area_code}.json"
 ICON_BASE_URL = "https://www.jma.go.jp/bosai/forecast/img/"
+AREA_SNAPSHOT = "area_snapshot.json"
+
+# Bulk fetch settings (all JMA endpoints live on the same host)
+MAX_WORKERS = 8
+MAX_PER_HOST = 4
+
+# Transport settings
+REQUEST_TIMEOUT = (3.05, 10)  # (connect, read) seconds per attempt
+TIMEOUT_BUDGET = 30           # seconds for one request including all retries
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_lock = threading.Lock()
+_host_slots = {}
+_validators = {}  # url -> {"etag", "last_modified", "data"}
+
+def _get_session():
+    """Returns one shared Session so connections are pooled between calls."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+def _host_slot(url):
+    """Semaphore limiting concurrent requests to one host."""
+    host = urlparse(url).netloc
+    with _lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return _host_slots[host]
+
+def _get(url, headers=None):
+    """
+    GET through the shared session. Connection errors, timeouts and
+    RETRY_STATUSES are retried with exponential backoff until MAX_RETRIES
+    or TIMEOUT_BUDGET runs out.
+    """
+    deadline = time.monotonic() + TIMEOUT_BUDGET
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        connect, read = REQUEST_TIMEOUT
+        timeout = (min(connect, remaining), min(read, remaining))
+        try:
+            with _host_slot(url):
+                response = _get_session().get(url, headers=headers, timeout=timeout)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            error = None
+        except (requests.ConnectionError, requests.Timeout) as e:
+            response, error = None, e
+
+        delay = BACKOFF_BASE * (2 ** attempt)
+        attempt += 1
+        if attempt > MAX_RETRIES or time.monotonic() + delay >= deadline:
+            if error is not None:
+                raise error
+            return response
+        time.sleep(delay)
+
+def _get_json(url):
+    """
+    Returns the JSON body of url, revalidating with ETag/Last-Modified.
+    A 304 reuses the previously downloaded payload.
+    """
+    with _lock:
+        cached = _validators.get(url)
+
+    headers = {}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    response = _get(url, headers)
+    if response.status_code == 304 and cached:
+        return cached["data"]
+    response.raise_for_status()
+    data = response.json()
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        with _lock:
+            _validators[url] = {"etag": etag, "last_modified": last_modified, "data": data}
+    return data
 
 def get_area_data():
     """Fetches area definitions."""
     try:
-        response = requests.get(AREA_URL)
-        response.raise_for_status()
-        data = response.json()
+        data = _get_json(AREA_URL)
         
         centers = data.get("centers", {})
         offices = data.get("offices", {})
@@ -29,88 +128,90 @@ def get_area_data():
         print(f"Error area data: {e}")
         return {}
 
-def _fmt_date(iso_str):
+def load_area_snapshot(path=AREA_SNAPSHOT):
+    """Reads the region -> office tree saved by refresh_area_snapshot() ({} if none)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def refresh_area_snapshot(path=AREA_SNAPSHOT):
+    """
+    Downloads area.json and rewrites the local snapshot if the derived tree
+    changed. Returns the fresh tree ({} on failure).
+    """
+    structured = get_area_data()
+    if structured and structured != load_area_snapshot(path):
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(structured, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Error saving area snapshot: {e}")
+    return structured
+
+def fetch_icon(icon_url):
+    """Downloads one weather icon (SVG bytes), or None on failure."""
     try:
-        return datetime.datetime.fromisoformat(iso_str).strftime("%Y-%m-%d")
-    except:
-        return iso_str
+        response = _get(icon_url)
+        response.raise_for_status()
+        return response.content
+    except Exception as e:
+        print(f"Icon Error: {e}")
+        return None
 
 def fetch_weather_data(area_code):
     """
     Fetches raw weather data from JMA, cleans it, and returns a list of dictionaries.
     (This function does NOT interact with the DB).
     """
+    return fetch_weather_report(area_code)[1]
+
+def fetch_weather_report(area_code):
+    """
+    Same as fetch_weather_data, but returns (report_datetime, forecast_list)
+    so callers can tell which JMA publication the forecasts belong to.
+    """
     url = FORECAST_URL_TEMPLATE.format(area_code=area_code)
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        if not data: return []
+        data = _get_json(url)
+        if not data: return None, []
+        return data[0].get("reportDatetime"), _parse_forecast(data)
+    except Exception as e:
+        print(f"API Error: {e}")
+        return None, []
 
-        report0 = data[0]
-        try:
-            ts_weather = report0["timeSeries"][0]
-            dates = ts_weather["timeDefines"]
-            area_data = ts_weather["areas"][0]
-            codes = area_data.get("weatherCodes", [])
-            texts = area_data.get("weathers", [])
-        except:
+def _parse_forecast(data):
+    """Forecast dicts for the office's first sub-area (see jma_parser for all of them)."""
+    try:
+        report = jma_parser.parse_forecast(data)
+        if report is None:
             return []
+        return report.areas[0].to_dicts(ICON_BASE_URL)
+    except Exception as e:
+        print(f"Parse Error: {e}")
+        return []
 
-        forecast_map = {}
-        for i, d_iso in enumerate(dates):
-            d_key = _fmt_date(d_iso)
-            code = codes[i] if i < len(codes) else "100"
-            text = texts[i] if i < len(texts) else ""
-            
-            forecast_map[d_key] = {
-                "date": d_key,
-                "weather": text,
-                "icon": f"{ICON_BASE_URL}{code}.svg",
-                "min": "-", 
-                "max": "-" 
-            }
-
-        if len(data) > 1:
-            try:
-                report1 = data[1]
-                for ts in report1["timeSeries"]:
-                    if "tempsMin" in ts["areas"][0] or "tempsMax" in ts["areas"][0]:
-                        t_dates = ts["timeDefines"]
-                        t_mins = ts["areas"][0].get("tempsMin", [])
-                        t_maxs = ts["areas"][0].get("tempsMax", [])
-                        
-                        for i, d_iso in enumerate(t_dates):
-                            d_key = _fmt_date(d_iso)
-                            if d_key in forecast_map:
-                                val_min = t_mins[i] if i < len(t_mins) else ""
-                                val_max = t_maxs[i] if i < len(t_maxs) else ""
-                                if val_min and val_min != "": forecast_map[d_key]["min"] = val_min
-                                if val_max and val_max != "": forecast_map[d_key]["max"] = val_max
-            except: pass
+def fetch_all_weather_data(area_codes=None, max_workers=MAX_WORKERS):
+    """
+    Fetches forecasts for many offices concurrently (all offices by default).
+    Yields (area_code, forecast_list) pairs in the order they finish.
+    """
+    if area_codes is None:
+        area_codes = [code for prefs in get_area_data().values() for code in prefs.values()]
+    area_codes = list(dict.fromkeys(area_codes))
 
-        try:
-            if len(report0["timeSeries"]) >= 3:
-                ts_temps = report0["timeSeries"][2]
-                if "temps" in ts_temps["areas"][0]:
-                    t_dates = ts_temps["timeDefines"]
-                    t_vals = ts_temps["areas"][0]["temps"]
-                    
-                    day_temps = {}
-                    for i, d_iso in enumerate(t_dates):
-                        d_key = _fmt_date(d_iso)
-                        if d_key not in day_temps: day_temps[d_key] = []
-                        try: day_temps[d_key].append(float(t_vals[i]))
-                        except: pass
-                    
-                    for d_key, temps in day_temps.items():
-                        if d_key in forecast_map:
-                            if forecast_map[d_key]["max"] == "-" and temps:
-                                forecast_map[d_key]["max"] = str(int(max(temps)))
-        except: pass
-
-        return sorted(forecast_map.values(), key=lambda x: x["date"])
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_weather_data, code): code for code in area_codes}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
 
-    except Exception as e:
-        print(f"API Error: {e}")
-        return []
\ No newline at end of file
+if __name__ == "__main__":
+    start = time.perf_counter()
+    count = 0
+    for code, forecasts in fetch_all_weather_data():
+        count += 1
+        print(f"{code}: {len(forecasts)} days")
+    print(f"Fetched {count} offices in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,191 @@
+import datetime
+from functools import lru_cache
+
+@lru_cache(maxsize=1024)
+def parse_date(iso_str):
+    """Convert '2025-12-17T17:00...' to '2025-12-17' (memoized, JMA repeats the same few timestamps)."""
+    try:
+        return datetime.datetime.fromisoformat(iso_str).strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return iso_str
+
+class AreaForecast:
+    """
+    Daily forecast columns for one sub-area of an office.
+    Column i of every list belongs to dates[i]; missing temperatures are "-".
+    temp_times/temps hold the short-term point temperatures as published.
+    """
+    __slots__ = ("area_code", "area_name", "dates", "weather_codes", "weathers",
+                 "temps_min", "temps_max", "temp_times", "temps", "_index")
+
+    def __init__(self, area, dates):
+        info = area.get("area", {})
+        codes = area.get("weatherCodes", [])
+        texts = area.get("weathers", [])
+
+        self.area_code = info.get("code")
+        self.area_name = info.get("name")
+        self.dates = []
+        self.weather_codes = []
+        self.weathers = []
+        self._index = {}
+        for i, d_key in enumerate(dates):
+            code = codes[i] if i < len(codes) else "100"
+            text = texts[i] if i < len(texts) else ""
+            pos = self._index.get(d_key)
+            if pos is None:
+                self._index[d_key] = len(self.dates)
+                self.dates.append(d_key)
+                self.weather_codes.append(code)
+                self.weathers.append(text)
+            else:
+                self.weather_codes[pos] = code
+                self.weathers[pos] = text
+        self.temps_min = ["-"] * len(self.dates)
+        self.temps_max = ["-"] * len(self.dates)
+        self.temp_times = []
+        self.temps = []
+
+    def apply_min_max(self, dates, mins, maxs):
+        """Weekly tempsMin/tempsMax; empty strings keep the previous value."""
+        index = self._index
+        for i, d_key in enumerate(dates):
+            pos = index.get(d_key)
+            if pos is None:
+                continue
+            val_min = mins[i] if i < len(mins) else ""
+            val_max = maxs[i] if i < len(maxs) else ""
+            if val_min: self.temps_min[pos] = val_min
+            if val_max: self.temps_max[pos] = val_max
+
+    def apply_temps(self, times, temps):
+        """
+        Short-term temps (one value per entry of times, "" if not published).
+        Stored as published; the highest value of a day fills in a missing max.
+        """
+        self.temp_times = list(times)
+        self.temps = [temps[i] if i < len(temps) else "" for i in range(len(times))]
+
+        day_max = {}
+        for time_define, temp in zip(self.temp_times, self.temps):
+            try:
+                value = float(temp)
+            except (TypeError, ValueError):
+                continue
+            d_key = parse_date(time_define)
+            if d_key not in day_max or value > day_max[d_key]:
+                day_max[d_key] = value
+
+        for d_key, value in day_max.items():
+            pos = self._index.get(d_key)
+            if pos is not None and self.temps_max[pos] == "-":
+                self.temps_max[pos] = str(int(value))
+
+    def to_dicts(self, icon_base_url):
+        """The list-of-dicts format used by the app and db.py, sorted by date."""
+        order = sorted(range(len(self.dates)), key=self.dates.__getitem__)
+        return [
+            {
+                "date": self.dates[i],
+                "weather": self.weathers[i],
+                "icon": f"{icon_base_url}{self.weather_codes[i]}.svg",
+                "min": self.temps_min[i],
+                "max": self.temps_max[i],
+            }
+            for i in order
+        ]
+
+class ForecastReport:
+    __slots__ = ("report_datetime", "publishing_office", "areas")
+
+    def __init__(self, report_datetime, publishing_office, areas):
+        self.report_datetime = report_datetime
+        self.publishing_office = publishing_office
+        self.areas = areas
+
+def _weekly_pairs(areas, weekly_series):
+    """
+    (AreaForecast, weekly temperature area) pairs. The weekly report has fewer, coarser
+    areas than the daily one, so they cannot be paired by position. Its weather areas
+    (listed in the same order as its temperature points) are matched to daily areas by
+    area code; a weekly area with no daily counterpart only applies to the office's
+    first area, like the single-area parser did.
+    """
+    weekly_areas, t_areas = weekly_series
+    by_code = {area.area_code: area for area in areas}
+    pairs = []
+    covered = set()
+    if len(weekly_areas) == len(t_areas):
+        for w_area, t_area in zip(weekly_areas, t_areas):
+            area = by_code.get(w_area.get("area", {}).get("code"))
+            if area is not None and area.area_code not in covered:
+                covered.add(area.area_code)
+                pairs.append((area, t_area))
+    if areas[0].area_code not in covered:
+        unmatched = [t for w, t in zip(weekly_areas, t_areas)
+                     if w.get("area", {}).get("code") not in by_code] or t_areas[:1]
+        pairs.append((areas[0], unmatched[0]))
+    return pairs
+
+def parse_forecast(data):
+    """
+    Parses a forecast/{area_code}.json payload into a ForecastReport with one
+    AreaForecast per sub-area. Weekly min/max are matched to sub-areas by area
+    code (see _weekly_pairs); short-term temperature points are paired with the
+    weather areas by position when there is one per area, otherwise only the
+    first area gets them. Returns None if the payload has no weather series.
+    """
+    if not data:
+        return None
+    report0 = data[0]
+    try:
+        series = report0["timeSeries"]
+        ts_weather = series[0]
+        dates = [parse_date(d) for d in ts_weather["timeDefines"]]
+        areas = [AreaForecast(area, dates) for area in ts_weather["areas"]]
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return None
+    if not areas:
+        return None
+
+    # Weekly report: weather areas in timeSeries[0], tempsMin / tempsMax points after it
+    if len(data) > 1:
+        try:
+            weekly = data[1]["timeSeries"]
+            for ts in weekly:
+                t_areas = ts["areas"]
+                if "tempsMin" not in t_areas[0] and "tempsMax" not in t_areas[0]:
+                    continue
+                t_dates = [parse_date(d) for d in ts["timeDefines"]]
+                for area, t_area in _weekly_pairs(areas, (weekly[0]["areas"], t_areas)):
+                    area.apply_min_max(t_dates, t_area.get("tempsMin", []), t_area.get("tempsMax", []))
+        except (KeyError, IndexError, TypeError, AttributeError):
+            pass
+
+    # Short-term temps (also fill in a missing max, e.g. today's in the evening report)
+    try:
+        if len(series) >= 3 and "temps" in series[2]["areas"][0]:
+            t_times = series[2]["timeDefines"]
+            t_areas = series[2]["areas"]
+            pairs = zip(areas, t_areas) if len(t_areas) == len(areas) else [(areas[0], t_areas[0])]
+            for area, t_area in pairs:
+                area.apply_temps(t_times, t_area.get("temps", []))
+    except (KeyError, IndexError, TypeError, AttributeError):
+        pass
+
+    return ForecastReport(report0.get("reportDatetime"), report0.get("publishingOffice"), areas)
+
+if __name__ == "__main__":
+    # Microbenchmark: python jma_parser.py saved_payload.json [...]
+    import json
+    import sys
+    import timeit
+
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        runs = 2000
+        seconds = timeit.timeit(lambda: parse_forecast(payload), number=runs)
+        report = parse_forecast(payload)
+        n_areas = len(report.areas) if report else 0
+        print(f"{path}: {seconds / runs * 1e6:.1f} us/payload ({n_areas} areas)")